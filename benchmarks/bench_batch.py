@@ -0,0 +1,90 @@
+"""
+Throughput benchmark for /predict/batch against a local stub model.
+
+Compares the nightly re-analysis pattern of one /predict request per panel
+with a single streaming /predict/batch request over the same number of panels.
+A fraction of the panels are duplicates to exercise in-batch dedup.
+
+Usage:
+    pip install httpx
+    python benchmarks/bench_batch.py --panels 2000 --duplicates 0.2 --latency 0.05 --concurrency 32
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import httpx
+
+from stub_model import StubModel
+
+
+def make_panels(count: int, duplicates: float, offset: int):
+    unique = max(1, int(count * (1 - duplicates)))
+    panels = [{"ldl": 60.0 + offset + i * 0.01} for i in range(unique)]
+    panels += [random.choice(panels) for _ in range(count - unique)]
+    random.shuffle(panels)
+    return panels
+
+
+async def run_sequential(client: httpx.AsyncClient, panels):
+    start = time.perf_counter()
+    for panel in panels:
+        (await client.post("/predict", json=panel)).raise_for_status()
+    return time.perf_counter() - start
+
+
+async def run_batch(client: httpx.AsyncClient, panels):
+    body = "\n".join(json.dumps(p) for p in panels)
+    start = time.perf_counter()
+    lines, errors = 0, 0
+    async with client.stream("POST", "/predict/batch", content=body, headers={"content-type": "application/x-ndjson"}) as response:
+        async for line in response.aiter_lines():
+            if not line:
+                continue
+            lines += 1
+            errors += json.loads(line)["status"] != "ok"
+    return time.perf_counter() - start, lines, errors
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--panels", type=int, default=2000)
+    parser.add_argument("--duplicates", type=float, default=0.2, help="fraction of repeated panels")
+    parser.add_argument("--latency", type=float, default=0.05, help="stub model latency in seconds")
+    parser.add_argument("--concurrency", type=int, default=32, help="BATCH_CONCURRENCY, BATCH_MAX_INFLIGHT and MAX_CONCURRENCY")
+    parser.add_argument("--sequential-panels", type=int, default=200, help="panels for the per-request baseline")
+    args = parser.parse_args()
+
+    # Batch calls are also capped by BATCH_MAX_INFLIGHT and the shared limiter, so size all three.
+    for name in ("BATCH_CONCURRENCY", "BATCH_MAX_INFLIGHT", "MAX_CONCURRENCY"):
+        os.environ.setdefault(name, str(args.concurrency))
+    import app as service
+
+    inflight = min(service.BATCH_CONCURRENCY, service.BATCH_MAX_INFLIGHT, service.MAX_CONCURRENCY)
+    if inflight != args.concurrency:
+        print(f"note: environment caps in-flight batch calls at {inflight}, not --concurrency {args.concurrency}")
+
+    model = service.app.state.model = StubModel(latency=args.latency)
+    transport = httpx.ASGITransport(app=service.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        baseline = make_panels(args.sequential_panels, args.duplicates, offset=1000)
+        elapsed = await run_sequential(client, baseline)
+        print(f"per-request  {len(baseline) / elapsed:8.1f} panels/s   ({len(baseline)} panels, {elapsed:.2f}s)")
+
+        model.calls = 0
+        panels = make_panels(args.panels, args.duplicates, offset=0)
+        elapsed, lines, errors = await run_batch(client, panels)
+        print(
+            f"batch        {lines / elapsed:8.1f} panels/s   ({lines} panels, {elapsed:.2f}s, "
+            f"{model.calls} upstream calls, {errors} errors)"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,153 @@
+"""
+Bulk ingestion benchmark: columnar PanelFrame vs one BiomarkerRequest per panel.
+
+Generates a CSV of N synthetic panels (about 1% of rows carry a bad cell), then
+for each path measures parse + validate + score time and memory with
+tracemalloc: peak while ingesting and bytes still held by the result. Checks
+that both paths reject the same rows and build equal models. The same panels
+are also ingested from an in-memory NumPy structured array, where no text
+parsing is involved.
+
+Usage:
+    python benchmarks/bench_ingest.py --panels 50000
+"""
+import argparse
+import csv
+import gc
+import io
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import numpy as np
+from pydantic import ValidationError
+
+from ingest import COLUMNS, INTEGER_COLUMNS, from_records, read_csv
+from schemas import BiomarkerRequest
+from scoring import panel_values, score_matrix
+
+
+def make_csv(panels: int, bad_rate: float) -> str:
+    rng = random.Random(0)
+    names = list(BiomarkerRequest.model_fields)
+    defaults = [BiomarkerRequest.model_fields[name].default for name in names]
+    out = io.StringIO()
+    writer = csv.writer(out)
+    writer.writerow(names)
+    for _ in range(panels):
+        row = []
+        for name, default in zip(names, defaults):
+            if name == "gender":
+                row.append(rng.choice(("male", "female")))
+            elif name == "age":
+                row.append(rng.randint(18, 90))
+            else:
+                row.append(round(default * rng.uniform(0.6, 1.4), 3))
+        if rng.random() < bad_rate:
+            row[rng.randrange(4, len(row))] = "n/a"
+        writer.writerow(row)
+    return out.getvalue()
+
+
+def per_object(text: str):
+    models, errors = [], set()
+    for index, row in enumerate(csv.DictReader(io.StringIO(text))):
+        try:
+            models.append(BiomarkerRequest.model_validate(row))
+        except ValidationError:
+            errors.add(index)
+    score_matrix(*panel_values(models))
+    return models, errors
+
+
+def columnar(text: str):
+    frame = read_csv(io.StringIO(text))
+    frame.score()
+    return frame, set(frame.errors)
+
+
+def to_records(frame) -> np.ndarray:
+    dtype = [(name, np.int64 if name in INTEGER_COLUMNS else np.float64) for name in COLUMNS] + [("gender", "U8")]
+    valid = frame.values[frame.valid]
+    records = np.empty(len(valid), dtype=dtype)
+    for j, name in enumerate(COLUMNS):
+        records[name] = valid[:, j]
+    records["gender"] = np.array(frame.gender_labels)[frame.gender_codes[frame.valid]]
+    return records
+
+
+def per_object_records(records: np.ndarray):
+    names = records.dtype.names
+    models = [BiomarkerRequest.model_validate(dict(zip(names, row))) for row in records.tolist()]
+    score_matrix(*panel_values(models))
+    return models
+
+
+def columnar_records(records: np.ndarray):
+    frame = from_records(records)
+    frame.score()
+    return frame
+
+
+def measure(fn, text: str):
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fn(text)
+    elapsed = time.perf_counter() - start
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, retained, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--panels", type=int, default=50000)
+    parser.add_argument("--bad-rate", type=float, default=0.01)
+    args = parser.parse_args()
+
+    text = make_csv(args.panels, args.bad_rate)
+    print(f"{args.panels:,} panels, {len(text) / 1e6:.1f} MB CSV")
+
+    (models, object_errors), t_object, r_object, p_object = measure(per_object, text)
+    (frame, frame_errors), t_frame, r_frame, p_frame = measure(columnar, text)
+
+    # tracemalloc slows allocation-heavy code, so time again without it.
+    t_object = min(t_object, min(timer(per_object, text) for _ in range(2)))
+    t_frame = min(t_frame, min(timer(columnar, text) for _ in range(2)))
+
+    print(f"{'path':<12} {'panels/s':>12} {'peak MB':>9} {'held MB':>9} {'held B/panel':>13}")
+    for label, elapsed, retained, peak in (("per-object", t_object, r_object, p_object), ("columnar", t_frame, r_frame, p_frame)):
+        print(
+            f"{label:<12} {args.panels / elapsed:>12,.0f} {peak / 1e6:>9.1f} {retained / 1e6:>9.1f} "
+            f"{retained / args.panels:>13,.0f}"
+        )
+    print(f"speedup {t_object / t_frame:.1f}x, held memory {r_object / max(r_frame, 1):.1f}x smaller")
+
+    records = to_records(frame)
+    t_object_records = min(timer(per_object_records, records) for _ in range(3))
+    t_frame_records = min(timer(columnar_records, records) for _ in range(3))
+    print(
+        f"records      per-object {len(records) / t_object_records:,.0f} panels/s, "
+        f"columnar {len(records) / t_frame_records:,.0f} panels/s ({t_object_records / t_frame_records:.0f}x)"
+    )
+
+    valid = [i for i in range(args.panels) if i not in frame_errors]
+    sample = np.random.default_rng(0).choice(len(valid), size=min(200, len(valid)), replace=False)
+    same = object_errors == frame_errors and all(frame.model(valid[i]) == models[i] for i in sample)
+    print(f"rejected rows: {len(frame_errors)}, equivalent to per-object path: {same}")
+    sys.exit(0 if same else 1)
+
+
+def timer(fn, text: str) -> float:
+    start = time.perf_counter()
+    fn(text)
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Output mode benchmark: markdown + regex parsing vs schema-constrained JSON.
+
+Each markdown response in the corpus is parsed, then re-encoded as the JSON
+that OUTPUT_MODE=json returns for the same content, so both modes carry
+identical reports. For every document:
+
+1. Checks that `parse_structured_report(json)` equals
+   `parse_medical_report(markdown, clean=True)`.
+2. Times both parsers and compares output size. Token counts are estimated
+   at ~4 characters per token, as in prompt_builder.
+3. Runs `pipeline.generate_report` in both modes against stub models whose
+   latency is `--ttft` plus output tokens at `--tokens-per-s`, so end-to-end
+   latency reflects each mode's output length.
+
+Usage:
+    python benchmarks/bench_output_mode.py --iterations 2000 --panels 200
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+import timeit
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, ".."))
+sys.path.insert(0, BENCH_DIR)
+
+import pipeline
+from bench_parser import load_corpus
+from prompt_builder import JSON_SYSTEM_INSTRUCTION, SYSTEM_INSTRUCTION, estimate_tokens
+from report_parser import parse_medical_report, parse_structured_report
+from schemas import RESPONSE_SCHEMA, BiomarkerRequest, StructuredReport
+from stub_model import StubModel
+
+
+def to_json(markdown: str) -> str:
+    return StructuredReport.from_report(parse_medical_report(markdown, clean=True)).model_dump_json()
+
+
+async def end_to_end(mode: str, reports, panels: int, concurrency: int, ttft: float, tokens_per_s: float):
+    pipeline.OUTPUT_MODE = mode
+    models = [StubModel(latency=ttft + estimate_tokens(text) / tokens_per_s, report=text) for text in reports]
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one(i: int):
+        async with semaphore:
+            start = time.perf_counter()
+            await pipeline.generate_report(models[i % len(models)], BiomarkerRequest(ldl=130 + i % 50, vitamin_d=20))
+            latencies.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(one(i) for i in range(panels)))
+    latencies.sort()
+    return statistics.mean(latencies), latencies[int(0.99 * (len(latencies) - 1))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", default=os.path.join(BENCH_DIR, "corpus", "*.md"))
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--panels", type=int, default=200, help="generate_report calls per mode")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--ttft", type=float, default=0.3, help="simulated time to first token (seconds)")
+    parser.add_argument("--tokens-per-s", type=float, default=250.0, help="simulated output decode rate")
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus)
+    if not corpus:
+        sys.exit(f"No corpus documents match {args.corpus}")
+
+    failed = False
+    totals = {"markdown": 0.0, "json": 0.0}
+    tokens = {"markdown": 0, "json": 0}
+    print(f"{'document':<28} {'md tok':>7} {'json tok':>9} {'md parse µs':>12} {'json parse µs':>14} {'speedup':>8}")
+    for name, markdown in corpus.items():
+        structured = to_json(markdown)
+        if parse_structured_report(structured, clean=True) != parse_medical_report(markdown, clean=True):
+            print(f"{name:<28} OUTPUT MISMATCH")
+            failed = True
+            continue
+        t_md = min(timeit.repeat(lambda: parse_medical_report(markdown, clean=True), number=args.iterations, repeat=3))
+        t_json = min(timeit.repeat(lambda: parse_structured_report(structured, clean=True), number=args.iterations, repeat=3))
+        t_md, t_json = t_md / args.iterations, t_json / args.iterations
+        totals["markdown"] += t_md
+        totals["json"] += t_json
+        tokens["markdown"] += estimate_tokens(markdown)
+        tokens["json"] += estimate_tokens(structured)
+        print(
+            f"{name:<28} {estimate_tokens(markdown):>7} {estimate_tokens(structured):>9} "
+            f"{t_md * 1e6:>12.1f} {t_json * 1e6:>14.1f} {t_md / t_json:>7.2f}x"
+        )
+    if failed:
+        sys.exit(1)
+
+    print(
+        f"{'total':<28} {tokens['markdown']:>7} {tokens['json']:>9} {totals['markdown'] * 1e6:>12.1f} "
+        f"{totals['json'] * 1e6:>14.1f} {totals['markdown'] / totals['json']:>7.2f}x"
+    )
+    schema_tokens = estimate_tokens(json.dumps(RESPONSE_SCHEMA))
+    print(
+        f"system instruction tokens: markdown {estimate_tokens(SYSTEM_INSTRUCTION)}, "
+        f"json {estimate_tokens(JSON_SYSTEM_INSTRUCTION)} + ~{schema_tokens} schema"
+    )
+
+    print(f"end to end ({args.panels} panels, ttft {args.ttft}s, {args.tokens_per_s:.0f} tok/s):")
+    for mode, reports in (("markdown", list(corpus.values())), ("json", [to_json(text) for text in corpus.values()])):
+        mean, p99 = asyncio.run(end_to_end(mode, reports, args.panels, args.concurrency, args.ttft, args.tokens_per_s))
+        print(f"  {mode:<9} mean {mean * 1000:8.1f} ms   p99 {p99 * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
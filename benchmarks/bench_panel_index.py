@@ -0,0 +1,102 @@
+"""
+Near-duplicate reuse benchmark for the quantized panel index.
+
+1. Reuse: a stream of repeat visits per synthetic patient, each with small
+   measurement noise, is run through the exact response-cache key and the
+   panel index. Reports the exact-match hit rate against the share of flagged
+   systems whose narrative is reused (and so not requested from Gemini).
+2. Scale: fills the index with `--fill` entries and times single-panel lookups,
+   plus bulk `quantize` throughput for offline signature building.
+
+Usage:
+    python benchmarks/bench_panel_index.py --patients 2000 --visits 5 --noise 0.01 --fill 1000000
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import numpy as np
+
+from cache import canonical_key
+from panel_index import PanelIndex, quantize
+from schemas import BiomarkerRequest
+from scoring import FIELDS, score_panel
+
+
+def make_visits(patients: int, visits: int, noise: float):
+    rng = np.random.default_rng(0)
+    defaults = np.array([BiomarkerRequest.model_fields[name].default for name in FIELDS])
+    panels = []
+    for _ in range(patients):
+        base = defaults * rng.lognormal(0, 0.25, size=len(FIELDS))
+        gender, age = rng.choice(("male", "female")), int(rng.integers(20, 85))
+        for _ in range(visits):
+            values = np.round(base * rng.normal(1.0, noise, size=len(FIELDS)), 1)
+            panels.append(BiomarkerRequest(age=age, gender=gender, **dict(zip(FIELDS, values.tolist()))))
+    random.Random(0).shuffle(panels)
+    return panels
+
+
+async def reuse(panels, steps: int):
+    index = PanelIndex(steps=steps)
+    exact, exact_hits, flagged, full = set(), 0, 0, 0
+    for data in panels:
+        key = canonical_key(data, "bench", "bench")
+        exact_hits += key in exact
+        exact.add(key)
+
+        score = score_panel(data)
+        reused, missing = await index.lookup(data, score)
+        flagged += len(reused) + len(missing)
+        full += bool(reused) and not missing
+        await index.remember(missing, {system: "narrative" for system in missing})
+    return exact_hits, flagged, index.stats["reused"], full, len(index.store)
+
+
+async def lookup_latency(fill: int, panels, steps: int):
+    index = PanelIndex(steps=steps, max_entries=fill + len(panels) * 16)
+    for i in range(fill):
+        await index.store.set(f"{i:032x}", "narrative")
+    scores = [score_panel(p) for p in panels]
+    start = time.perf_counter()
+    for data, score in zip(panels, scores):
+        await index.lookup(data, score)
+    return (time.perf_counter() - start) / len(panels)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--patients", type=int, default=2000)
+    parser.add_argument("--visits", type=int, default=5)
+    parser.add_argument("--noise", type=float, default=0.01, help="relative std-dev between visits")
+    parser.add_argument("--steps", type=int, default=4, help="bins per reference-range width")
+    parser.add_argument("--fill", type=int, default=1_000_000, help="entries preloaded for the lookup timing")
+    args = parser.parse_args()
+
+    panels = make_visits(args.patients, args.visits, args.noise)
+    exact_hits, flagged, reused, full, entries = await reuse(panels, args.steps)
+    print(f"{len(panels):,} panels ({args.patients:,} patients x {args.visits} visits, noise {args.noise:.1%})")
+    print(f"  exact cache hits        {exact_hits / len(panels):8.1%}")
+    print(f"  system narratives reused{reused / max(flagged, 1):8.1%}  ({reused:,} of {flagged:,} flagged systems)")
+    print(f"  panels fully reused     {full / len(panels):8.1%}")
+    print(f"  index entries           {entries:8,}")
+
+    per_lookup = await lookup_latency(args.fill, panels[:2000], args.steps)
+    print(f"lookup with {args.fill:,} entries: {per_lookup * 1e6:.1f} µs per panel (signatures + get)")
+
+    rng = np.random.default_rng(1)
+    values = rng.uniform(0, 300, size=(1_000_000, len(FIELDS)))
+    genders = rng.integers(0, 2, size=len(values))
+    ages = rng.integers(18, 90, size=len(values)).astype(np.float64)
+    start = time.perf_counter()
+    quantize(values, genders, ages, args.steps)
+    print(f"bulk quantize: {len(values) / (time.perf_counter() - start):,.0f} panels/s")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,122 @@
+"""
+Parser benchmark over a corpus of recorded Gemini responses.
+
+Checks that `parse_medical_report(text, clean=True)` is byte-identical to the
+original `clean_json(parse_medical_report(text))` (kept in legacy_parser.py)
+for every corpus document, then times both. `--corpus` takes Markdown files or
+a replay corpus recorded with MODEL_BACKEND=record (JSONL, one document per
+recorded response).
+
+Regression gates (exit non-zero):
+- any output mismatch;
+- total speedup over the legacy parser below `--min-speedup`;
+- with `--baseline`, total current time more than `--max-regression` slower
+  than the timings saved by `--save-baseline`. Times are also normalized by the
+  legacy parser measured in the same run, so a slower machine does not trip it.
+
+Usage:
+    python benchmarks/bench_parser.py --iterations 2000 --min-speedup 1.5
+    python benchmarks/bench_parser.py --save-baseline parser_baseline.json
+    python benchmarks/bench_parser.py --corpus replay_corpus.jsonl --baseline parser_baseline.json --max-regression 0.2
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import timeit
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, ".."))
+sys.path.insert(0, BENCH_DIR)
+
+import legacy_parser
+from report_parser import parse_medical_report
+
+
+def load_corpus(pattern: str, limit: int = 50):
+    corpus = {}
+    for path in sorted(glob.glob(pattern)):
+        with open(path, encoding="utf-8") as f:
+            if not path.endswith(".jsonl"):
+                corpus[os.path.basename(path)] = f.read().strip()
+                continue
+            texts = {record["text"].strip() for record in map(json.loads, filter(str.strip, f)) if record.get("text")}
+            for i, text in enumerate(sorted(texts)[:limit]):
+                corpus[f"{os.path.basename(path)}:{i}"] = text
+    return corpus
+
+
+def legacy(text: str):
+    return legacy_parser.clean_json(legacy_parser.parse_medical_report(text))
+
+
+def current(text: str):
+    return parse_medical_report(text, clean=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", default=os.path.join(BENCH_DIR, "corpus", "*.md"))
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--min-speedup", type=float, default=0.0, help="fail if current/legacy speedup is lower")
+    parser.add_argument("--limit", type=int, default=50, help="distinct responses used from a JSONL corpus")
+    parser.add_argument("--save-baseline", help="write total timings to this JSON file")
+    parser.add_argument("--baseline", help="compare against timings saved by --save-baseline")
+    parser.add_argument("--max-regression", type=float, default=0.2, help="allowed relative slowdown vs --baseline")
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus, args.limit)
+    if not corpus:
+        sys.exit(f"No corpus documents match {args.corpus}")
+
+    failed = False
+    total_legacy = total_current = 0.0
+    print(f"{'document':<28} {'bytes':>7} {'legacy µs':>10} {'current µs':>11} {'speedup':>8}")
+    for name, text in corpus.items():
+        if json.dumps(legacy(text)) != json.dumps(current(text)):
+            print(f"{name:<28} OUTPUT MISMATCH")
+            failed = True
+            continue
+        t_legacy = min(timeit.repeat(lambda: legacy(text), number=args.iterations, repeat=3)) / args.iterations
+        t_current = min(timeit.repeat(lambda: current(text), number=args.iterations, repeat=3)) / args.iterations
+        total_legacy += t_legacy
+        total_current += t_current
+        print(f"{name:<28} {len(text):>7} {t_legacy * 1e6:>10.1f} {t_current * 1e6:>11.1f} {t_legacy / t_current:>7.2f}x")
+
+    if total_current:
+        speedup = total_legacy / total_current
+        print(f"{'total':<28} {'':>7} {total_legacy * 1e6:>10.1f} {total_current * 1e6:>11.1f} {speedup:>7.2f}x")
+        if speedup < args.min_speedup:
+            print(f"Speedup {speedup:.2f}x is below the required {args.min_speedup:.2f}x")
+            failed = True
+
+        timings = {"corpus": sorted(corpus), "legacy_us": total_legacy * 1e6, "current_us": total_current * 1e6}
+        if args.save_baseline:
+            with open(args.save_baseline, "w", encoding="utf-8") as f:
+                json.dump(timings, f, indent=2)
+            print(f"Baseline saved to {args.save_baseline}")
+        if args.baseline:
+            failed |= check_baseline(args.baseline, timings, args.max_regression)
+
+    sys.exit(1 if failed else 0)
+
+
+def check_baseline(path: str, timings, max_regression: float) -> bool:
+    """Returns True when the current parser regressed beyond `max_regression` against the saved baseline."""
+    with open(path, encoding="utf-8") as f:
+        baseline = json.load(f)
+    if baseline["corpus"] != timings["corpus"]:
+        print(f"Baseline {path} was measured on a different corpus; re-save it")
+        return True
+    absolute = timings["current_us"] / baseline["current_us"] - 1
+    relative = (timings["current_us"] / timings["legacy_us"]) / (baseline["current_us"] / baseline["legacy_us"]) - 1
+    print(f"vs baseline: {absolute:+.1%} absolute, {relative:+.1%} relative to the legacy parser")
+    if min(absolute, relative) > max_regression:
+        print(f"Parser hot path regressed by more than {max_regression:.0%}")
+        return True
+    return False
+
+
+if __name__ == "__main__":
+    main()
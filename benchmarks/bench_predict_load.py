@@ -0,0 +1,103 @@
+"""
+Load benchmark for /predict against a local stub that stands in for Gemini.
+
+Compares the previous blocking handler (sync `def` + `generate_content`, run in
+FastAPI's threadpool) with the async handler (`generate_content_async` on one
+shared model behind the concurrency limiter).
+
+Usage:
+    pip install httpx
+    python benchmarks/bench_predict_load.py --requests 400 --clients 200 --latency 1.0
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import httpx
+from fastapi import FastAPI, HTTPException
+
+from report_parser import clean_json, parse_medical_report
+from stub_model import StubModel
+
+
+# ---------------- Baseline (blocking) App ----------------
+def build_blocking_app(model: StubModel) -> FastAPI:
+    import app as service
+
+    legacy = FastAPI()
+
+    @legacy.post("/predict")
+    def predict(data: service.BiomarkerRequest):
+        try:
+            response = model.generate_content("prompt")
+            return clean_json(parse_medical_report(response.text.strip()))
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Prediction error: {str(e)}")
+
+    return legacy
+
+
+# ---------------- Async App ----------------
+def build_async_app(model: StubModel) -> FastAPI:
+    import app as service
+
+    service.app.state.model = model
+    return service.app
+
+
+# ---------------- Driver ----------------
+async def run_load(asgi_app: FastAPI, total: int, clients: int):
+    transport = httpx.ASGITransport(app=asgi_app)
+    latencies, statuses = [], {}
+    queue: asyncio.Queue = asyncio.Queue()
+    for i in range(total):
+        queue.put_nowait(i)
+
+    async def client_loop(client: httpx.AsyncClient):
+        while not queue.empty():
+            i = queue.get_nowait()
+            start = time.perf_counter()
+            # A distinct panel per request, so the response cache and request
+            # coalescing do not answer the async run without calling the model.
+            response = await client.post("/predict", json={"ldl": 60 + i * 0.01})
+            latencies.append(time.perf_counter() - start)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(client_loop(client) for _ in range(clients)))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    p50 = latencies[int(0.50 * (len(latencies) - 1))]
+    p99 = latencies[int(0.99 * (len(latencies) - 1))]
+    return total / elapsed, p50, p99, statuses
+
+
+def report(label: str, result):
+    rps, p50, p99, statuses = result
+    print(f"{label:<10} {rps:8.1f} req/s   p50 {p50 * 1000:8.1f} ms   p99 {p99 * 1000:8.1f} ms   status {statuses}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=1.0, help="stub model latency in seconds")
+    args = parser.parse_args()
+
+    # Size the limiter for the benchmark before the app module reads its settings.
+    os.environ.setdefault("MAX_CONCURRENCY", str(args.clients))
+    os.environ.setdefault("MAX_QUEUE_DEPTH", str(args.requests))
+
+    model = StubModel(latency=args.latency)
+    report("blocking", asyncio.run(run_load(build_blocking_app(model), args.requests, args.clients)))
+    report("async", asyncio.run(run_load(build_async_app(model), args.requests, args.clients)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""
+Bulk benchmark for the local reference-range pre-screen.
+
+Scores N synthetic panels (defaults with random multiplicative noise) with one
+vectorized `score_matrix` call and reports panels/s, plus the per-request
+latency of `score_panel` as used by /predict.
+
+Usage:
+    python benchmarks/bench_scoring.py --panels 100000
+"""
+import argparse
+import os
+import sys
+import time
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import numpy as np
+
+from schemas import BiomarkerRequest
+from scoring import FIELDS, SYSTEM_NAMES, score_matrix, score_panel
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--panels", type=int, default=100000)
+    parser.add_argument("--noise", type=float, default=0.25, help="relative std-dev applied to default values")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    defaults = np.array([BiomarkerRequest.model_fields[name].default for name in FIELDS], dtype=np.float64)
+    values = defaults * rng.normal(1.0, args.noise, size=(args.panels, len(FIELDS)))
+    genders = rng.integers(0, 2, size=args.panels)
+    ages = rng.integers(18, 90, size=args.panels).astype(np.float64)
+
+    best = float("inf")
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        _, systems = score_matrix(values, genders, ages)
+        best = min(best, time.perf_counter() - start)
+
+    flagged = (systems > 0).mean(axis=0)
+    print(f"bulk      {args.panels / best:12,.0f} panels/s   ({args.panels:,} panels in {best * 1000:.1f} ms)")
+    print(f"single    {timeit.timeit(lambda: score_panel(BiomarkerRequest()), number=2000) / 2000 * 1e6:12.1f} µs per score_panel call")
+    print("flagged share per system:")
+    for name, share in zip(SYSTEM_NAMES, flagged):
+        print(f"  {name:<55} {share:6.1%}")
+
+
+if __name__ == "__main__":
+    main()
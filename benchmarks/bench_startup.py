@@ -0,0 +1,109 @@
+"""
+Cold-start benchmark: import cost of `app` and time to first request.
+
+1. Runs `python -X importtime -c "import app"` in a fresh interpreter and lists
+   the slowest modules imported directly by the app.
+2. Starts uvicorn with the offline stub backend and measures the wall time from
+   process spawn until the first /predict request succeeds.
+
+Exits non-zero when the app import exceeds `--max-import-ms`, so it can gate
+regressions in CI.
+
+Usage:
+    python benchmarks/bench_startup.py --repeat 3 --max-import-ms 1500
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+IMPORT_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)")
+
+
+def stub_env(**extra) -> dict:
+    env = {k: v for k, v in os.environ.items() if k != "GEMINI_API_KEY"}
+    env.update(MODEL_BACKEND="stub", STUB_LATENCY_S="0", JOB_WORKERS="0", **extra)
+    return env
+
+
+def import_profile():
+    """Returns (total µs for `import app`, [(cumulative µs, module)] for its direct imports)."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app"],
+        cwd=ROOT, env=stub_env(), capture_output=True, text=True, check=True,
+    )
+    # Children are printed before their parent, indented two spaces per level.
+    total, children = 0, []
+    for line in result.stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if not match:
+            continue
+        cumulative, depth, name = int(match.group(2)), len(match.group(3)) // 2, match.group(4)
+        if depth == 0 and name == "app":
+            total = cumulative
+            break
+        if depth == 0:
+            children = []
+        elif depth == 1:
+            children.append((cumulative, name))
+    return total, sorted(children, reverse=True)
+
+
+def time_to_first_request(port: int, timeout: float = 60.0) -> float:
+    body = json.dumps({"ldl": 130}).encode()
+    with tempfile.TemporaryDirectory() as tmp:
+        env = stub_env(JOBS_DB_PATH=os.path.join(tmp, "jobs.db"))
+        start = time.perf_counter()
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app:app", "--port", str(port), "--log-level", "warning"],
+            cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        try:
+            while time.perf_counter() - start < timeout:
+                request = urllib.request.Request(
+                    f"http://127.0.0.1:{port}/predict", data=body, headers={"Content-Type": "application/json"}
+                )
+                try:
+                    with urllib.request.urlopen(request, timeout=5) as response:
+                        if response.status == 200:
+                            return time.perf_counter() - start
+                except (urllib.error.URLError, ConnectionError):
+                    time.sleep(0.01)
+            raise RuntimeError(f"server did not answer within {timeout}s")
+        finally:
+            server.terminate()
+            server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--top", type=int, default=10, help="slowest direct imports to list")
+    parser.add_argument("--port", type=int, default=8799)
+    parser.add_argument("--max-import-ms", type=float, default=0.0, help="fail if `import app` is slower (0 = no gate)")
+    args = parser.parse_args()
+
+    imports = [import_profile() for _ in range(args.repeat)]
+    total_ms = statistics.median(total for total, _ in imports) / 1000
+    print(f"import app            {total_ms:8.1f} ms (median of {args.repeat})")
+    for cumulative, name in imports[-1][1][:args.top]:
+        print(f"  {name:<30} {cumulative / 1000:8.1f} ms")
+
+    ttfr = [time_to_first_request(args.port) for _ in range(args.repeat)]
+    print(f"time to first request {statistics.median(ttfr) * 1000:8.1f} ms (median, uvicorn + stub backend)")
+
+    if args.max_import_ms and total_ms > args.max_import_ms:
+        print(f"Import time {total_ms:.1f} ms exceeds the {args.max_import_ms:.1f} ms budget")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Resilience benchmark for the upstream wrapper against a fault-injecting stub.
+
+Runs the same request stream against the bare stub and against `ResilientModel`
+in three scenarios and reports success rate, latency percentiles and how many
+upstream calls were made:
+
+- tail:   log-normal latency plus a share of very slow responses (hedging)
+- errors: a share of calls fail with ServiceUnavailable (retries)
+- outage: every call fails (circuit breaker fast-fail)
+
+Usage:
+    python benchmarks/bench_upstream.py --requests 2000 --concurrency 50 --latency 0.05
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from stub_model import StubModel
+from upstream import CircuitBreaker, ResilientModel
+
+
+def percentile(samples, q: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else float("nan")
+
+
+async def drive(model, requests: int, concurrency: int):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, failures = [], 0
+
+    async def one():
+        nonlocal failures
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                await model.generate_content_async("panel")
+            except Exception:
+                failures += 1
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    return time.perf_counter() - start, latencies, failures
+
+
+def report(label: str, stub: StubModel, requests: int, result):
+    elapsed, latencies, failures = result
+    print(
+        f"  {label:<10} ok {1 - failures / requests:7.2%}   "
+        f"p50 {percentile(latencies, 0.5) * 1000:8.1f} ms   p95 {percentile(latencies, 0.95) * 1000:8.1f} ms   "
+        f"p99 {percentile(latencies, 0.99) * 1000:8.1f} ms   {stub.calls / requests:5.2f} calls/req   {elapsed:6.2f}s"
+    )
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.05, help="median stub latency in seconds")
+    parser.add_argument("--tail-rate", type=float, default=0.03)
+    parser.add_argument("--tail-factor", type=float, default=20.0, help="tail latency as a multiple of --latency")
+    parser.add_argument("--error-rate", type=float, default=0.1)
+    args = parser.parse_args()
+
+    scenarios = {
+        "tail": dict(jitter=0.25, tail_rate=args.tail_rate, tail_latency=args.latency * args.tail_factor),
+        "errors": dict(jitter=0.25, error_rate=args.error_rate),
+        "outage": dict(error_rate=1.0),
+    }
+    for name, faults in scenarios.items():
+        print(f"{name}: {faults}")
+
+        stub = StubModel(latency=args.latency, seed=1, **faults)
+        report("direct", stub, args.requests, await drive(stub, args.requests, args.concurrency))
+
+        stub = StubModel(latency=args.latency, seed=1, **faults)
+        resilient = ResilientModel(stub, CircuitBreaker(5, 30), backoff_base=args.latency, backoff_max=args.latency * 8)
+        report("resilient", stub, args.requests, await drive(resilient, args.requests, args.concurrency))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,84 @@
+"""
+Verbatim copy of the original multi-regex parser, kept as the reference for
+equivalence checks and speed comparisons in bench_parser.py.
+"""
+import re
+from typing import Dict, List, Union
+
+
+# ---------------- Cleaning Utility ----------------
+def clean_json(data: Union[Dict, List, str]) -> Union[Dict, List, str]:
+    """Recursively removes separators, extra whitespace, and artifacts from all string values."""
+    if isinstance(data, str):
+        text = re.sub(r"-{3,}", "", data)
+        text = re.sub(r"\s+", " ", text)
+        text = text.strip(" -\n\t\r")
+        return text
+    elif isinstance(data, list):
+        return [clean_json(i) for i in data if i and clean_json(i)]
+    elif isinstance(data, dict):
+        return {k.strip(): clean_json(v) for k, v in data.items()}
+    return data
+
+
+# ---------------- Parser ----------------
+def parse_medical_report(text: str):
+    """
+    Parses Gemini markdown response → structured JSON.
+    Detects section headers, **bold keys**, and table entries.
+    """
+    def clean_line(line: str) -> str:
+        return re.sub(r"[\-\*\u2022]+\s*", "", line.strip())
+
+    def parse_bold_entities(block: str) -> Dict[str, str]:
+        """Extracts **bold** entities and maps text until next bold or section."""
+        entities = {}
+        pattern = re.compile(r"\*\*(.*?)\*\*(.*?)(?=\*\*|###|$)", re.S)
+        for match in pattern.finditer(block):
+            key = match.group(1).strip().strip(":")
+            val = match.group(2).strip().replace("\n", " ")
+            val = re.sub(r"\s+", " ", val)
+            if key:
+                entities[key] = val
+        return entities
+
+    data = {
+        "executive_summary": {"top_priorities": [], "key_strengths": []},
+        "system_analysis": {},
+        "personalized_action_plan": {},
+        "interaction_alerts": []
+    }
+
+    # --- Executive Summary ---
+    exec_match = re.search(r"###\s*Executive Summary(.*?)(?=###|$)", text, re.S | re.I)
+    if exec_match:
+        block = exec_match.group(1)
+        priorities = re.findall(r"\d+\.\s*(.*?)\n", block)
+        if priorities:
+            data["executive_summary"]["top_priorities"] = [clean_line(p) for p in priorities]
+        strengths_match = re.search(r"\*\*Key Strengths:\*\*(.*)", block, re.S)
+        if strengths_match:
+            strengths_text = strengths_match.group(1)
+            strengths = [clean_line(s) for s in strengths_text.splitlines() if clean_line(s)]
+            data["executive_summary"]["key_strengths"] = strengths
+
+    # --- System Analysis ---
+    sys_match = re.search(r"###\s*System[- ]Specific Analysis(.*?)(?=###|$)", text, re.S | re.I)
+    if sys_match:
+        sys_block = sys_match.group(1)
+        data["system_analysis"] = parse_bold_entities(sys_block)
+
+    # --- Personalized Action Plan ---
+    plan_match = re.search(r"###\s*Personalized Action Plan(.*?)(?=###|$)", text, re.S | re.I)
+    if plan_match:
+        plan_block = plan_match.group(1)
+        data["personalized_action_plan"] = parse_bold_entities(plan_block)
+
+    # --- Interaction Alerts ---
+    alerts_match = re.search(r"###\s*Interaction Alerts(.*?)(?=###|$)", text, re.S | re.I)
+    if alerts_match:
+        alerts_block = alerts_match.group(1)
+        alerts = [clean_line(a) for a in alerts_block.splitlines() if clean_line(a)]
+        data["interaction_alerts"] = alerts
+
+    return data
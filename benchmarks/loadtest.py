@@ -0,0 +1,246 @@
+"""
+End-to-end load test: the full FastAPI app under uvicorn with several workers,
+its Gemini calls served by the replay backend (no quota used).
+
+1. Uses `--corpus` (a JSONL file recorded with MODEL_BACKEND=record) or, if it
+   does not exist, builds a synthetic one from the parser corpus in
+   `benchmarks/corpus/` with log-normal latencies around `--latency`.
+2. Starts `uvicorn app:app --workers N` with MODEL_BACKEND=replay and a
+   limiter sized for `--clients`, waits until it answers, then runs a
+   closed-loop asyncio/httpx driver. Each request posts a distinct random
+   panel, so the response cache does not short-circuit the pipeline.
+3. Reports throughput, latency percentiles, status codes, RSS per worker
+   (sampled from /proc during the run) and the server-side parse stage time
+   scraped from one worker's /metrics.
+
+Exits non-zero when `--min-rps`, `--max-p99-ms` or `--max-parse-ms` is not
+met, so it can gate regressions in CI.
+
+Usage:
+    python benchmarks/loadtest.py --workers 4 --clients 200 --requests 4000 --latency 0.5
+    python benchmarks/loadtest.py --corpus replay_corpus.jsonl --workers 4 --max-p99-ms 2500
+"""
+import argparse
+import asyncio
+import glob
+import os
+import random
+import re
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.join(BENCH_DIR, "..")
+sys.path.insert(0, ROOT)
+
+import httpx
+
+from replay import write_corpus
+from schemas import BiomarkerRequest
+
+STAGE_LINE = re.compile(r'predict_stage_seconds_(sum|count)\{stage="(\w+)"\} (\S+)')
+
+
+# ---------------- Corpus + Panels ----------------
+def synthetic_corpus(path: str, latency: float, sigma: float, records: int = 1000):
+    texts = []
+    for name in sorted(glob.glob(os.path.join(BENCH_DIR, "corpus", "*.md"))):
+        with open(name, encoding="utf-8") as f:
+            texts.append(f.read().strip())
+    rng = random.Random(0)
+    write_corpus(path, texts, [latency * rng.lognormvariate(0, sigma) for _ in range(records)])
+
+
+def random_panels(count: int, seed: int = 1):
+    """Random panels around the field defaults; different seeds give non-overlapping sets in practice."""
+    rng = random.Random(seed)
+    fields = BiomarkerRequest.model_fields
+    panels = []
+    for _ in range(count):
+        panel = {}
+        for name, field in fields.items():
+            if name == "gender":
+                panel[name] = rng.choice(("male", "female"))
+            elif field.annotation is int:
+                panel[name] = rng.randint(18, 90) if name == "age" else field.default
+            else:
+                panel[name] = round(field.default * rng.uniform(0.5, 1.5), 2)
+        panels.append(panel)
+    return panels
+
+
+# ---------------- Server ----------------
+def start_server(args, corpus: str, tmp: str) -> subprocess.Popen:
+    env = {k: v for k, v in os.environ.items() if k != "GEMINI_API_KEY"}
+    env.update(
+        MODEL_BACKEND="replay",
+        REPLAY_CORPUS_PATH=os.path.abspath(corpus),
+        REPLAY_SPEED=str(args.speed),
+        JOB_WORKERS="0",
+        JOBS_DB_PATH=os.path.join(tmp, "jobs.db"),
+        MAX_CONCURRENCY=str(args.clients),
+        MAX_QUEUE_DEPTH=str(args.clients),
+    )
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app:app", "--port", str(args.port), "--workers", str(args.workers),
+         "--timeout-keep-alive", "60", "--log-level", "warning"],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+
+
+async def wait_ready(client: httpx.AsyncClient, timeout: float = 60.0):
+    start = time.perf_counter()
+    while time.perf_counter() - start < timeout:
+        try:
+            if (await client.get("/cache/stats")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.05)
+    raise RuntimeError(f"server did not answer within {timeout}s")
+
+
+# ---------------- RSS ----------------
+def worker_pids(master: int):
+    """Uvicorn worker processes (the master itself when running a single worker)."""
+    children = []
+    for stat in glob.glob("/proc/[0-9]*/stat"):
+        try:
+            with open(stat) as f:
+                fields = f.read().rsplit(")", 1)[1].split()
+            if int(fields[1]) != master:
+                continue
+            pid = int(stat.split("/")[2])
+            with open(f"/proc/{pid}/cmdline", "rb") as f:
+                if b"resource_tracker" in f.read():
+                    continue
+            children.append(pid)
+        except (OSError, IndexError, ValueError):
+            continue
+    return sorted(children) or [master]
+
+
+def rss_mb(pid: int) -> float:
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return 0.0
+
+
+async def sample_rss(master: int, peaks: dict, stop: asyncio.Event, interval: float = 0.25):
+    while not stop.is_set():
+        for pid in worker_pids(master):
+            peaks[pid] = max(peaks.get(pid, 0.0), rss_mb(pid))
+        try:
+            await asyncio.wait_for(stop.wait(), interval)
+        except asyncio.TimeoutError:
+            pass
+
+
+# ---------------- Driver ----------------
+async def drive(client: httpx.AsyncClient, panels, clients: int):
+    latencies, statuses = [], {}
+    pending = iter(panels)
+
+    async def client_loop():
+        for panel in pending:
+            start = time.perf_counter()
+            try:
+                status = (await client.post("/predict", json=panel)).status_code
+            except httpx.TransportError as e:
+                status = type(e).__name__
+            latencies.append(time.perf_counter() - start)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client_loop() for _ in range(clients)))
+    return time.perf_counter() - start, sorted(latencies), statuses
+
+
+def percentile(values, q: float) -> float:
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+async def parse_stage_ms(client: httpx.AsyncClient):
+    """Mean server-side time per pipeline stage, from whichever worker answers /metrics."""
+    sums, counts = {}, {}
+    for kind, stage, value in STAGE_LINE.findall((await client.get("/metrics")).text):
+        (sums if kind == "sum" else counts)[stage] = float(value)
+    return {stage: sums[stage] / counts[stage] * 1000 for stage in sums if counts.get(stage)}
+
+
+async def run(args, corpus: str):
+    with tempfile.TemporaryDirectory() as tmp:
+        server = start_server(args, corpus, tmp)
+        limits = httpx.Limits(max_connections=args.clients, max_keepalive_connections=args.clients)
+        try:
+            async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{args.port}", timeout=None, limits=limits) as client:
+                await wait_ready(client)
+                # The warm-up uses its own seed so the measured panels are not already cached.
+                await drive(client, random_panels(min(args.clients, args.requests), seed=0), args.clients)
+
+                peaks, stop = {}, asyncio.Event()
+                sampler = asyncio.create_task(sample_rss(server.pid, peaks, stop))
+                elapsed, latencies, statuses = await drive(client, random_panels(args.requests, seed=1), args.clients)
+                stop.set()
+                await sampler
+                stages = await parse_stage_ms(client)
+        finally:
+            server.terminate()
+            server.wait()
+    return elapsed, latencies, statuses, peaks, stages
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", default=os.path.join(ROOT, "replay_corpus.jsonl"), help="recorded JSONL corpus")
+    parser.add_argument("--latency", type=float, default=0.5, help="median latency of a synthetic corpus (seconds)")
+    parser.add_argument("--sigma", type=float, default=0.5, help="log-normal spread of a synthetic corpus")
+    parser.add_argument("--speed", type=float, default=1.0, help="multiplier on recorded latencies")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=4000)
+    parser.add_argument("--port", type=int, default=8798)
+    parser.add_argument("--min-rps", type=float, default=0.0, help="fail below this throughput (0 = no gate)")
+    parser.add_argument("--max-p99-ms", type=float, default=0.0, help="fail above this p99 latency (0 = no gate)")
+    parser.add_argument("--max-parse-ms", type=float, default=0.0, help="fail above this mean parse stage time (0 = no gate)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        corpus = args.corpus
+        if not os.path.exists(corpus):
+            corpus = os.path.join(tmp, "synthetic.jsonl")
+            synthetic_corpus(corpus, args.latency, args.sigma)
+            print(f"no recorded corpus at {args.corpus}; synthetic latencies, median {args.latency * 1000:.0f} ms")
+        elapsed, latencies, statuses, peaks, stages = asyncio.run(run(args, corpus))
+
+    rps = args.requests / elapsed
+    p99 = percentile(latencies, 0.99) * 1000
+    print(f"{args.requests:,} requests, {args.clients} clients, {args.workers} uvicorn workers: {rps:,.1f} req/s")
+    print("latency ms  " + "  ".join(f"p{int(q * 100)} {percentile(latencies, q) * 1000:.1f}" for q in (0.5, 0.9, 0.95, 0.99))
+          + f"  max {latencies[-1] * 1000:.1f}")
+    print(f"status      {statuses}")
+    print("peak RSS MB " + "  ".join(f"{pid}: {mb:.1f}" for pid, mb in sorted(peaks.items()))
+          + f"  (total {sum(peaks.values()):.1f})")
+    print("stage ms    " + "  ".join(f"{stage} {ms:.3f}" for stage, ms in sorted(stages.items())) + "  (one worker)")
+
+    failed = []
+    if args.min_rps and rps < args.min_rps:
+        failed.append(f"throughput {rps:.1f} req/s is below {args.min_rps:.1f}")
+    if args.max_p99_ms and p99 > args.max_p99_ms:
+        failed.append(f"p99 {p99:.1f} ms exceeds {args.max_p99_ms:.1f} ms")
+    if args.max_parse_ms and stages.get("parse", 0.0) > args.max_parse_ms:
+        failed.append(f"parse stage {stages['parse']:.3f} ms exceeds {args.max_parse_ms:.3f} ms")
+    for message in failed:
+        print(message)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
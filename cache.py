@@ -0,0 +1,146 @@
+import asyncio
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from pydantic import BaseModel
+
+
+# ---------------- Cache Key ----------------
+def _normalize(value: Any) -> Any:
+    if isinstance(value, str):
+        return value.strip().lower()
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+def canonical_key(data: BaseModel, model_id: str, prompt_version: str) -> str:
+    """Content-addressed key: SHA-256 over the normalized request fields, model and prompt version."""
+    fields = {name: _normalize(value) for name, value in data.model_dump().items()}
+    blob = json.dumps(
+        {"model": model_id, "prompt_version": prompt_version, "fields": fields},
+        sort_keys=True,
+        separators=(",", ":"),
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+# ---------------- Disk Tier ----------------
+class SQLiteStore:
+    """Persistent key → JSON store so cached reports survive restarts."""
+
+    def __init__(self, path: str):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._conn.execute("DELETE FROM responses WHERE expires_at < ?", (time.time(),))
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[tuple]:
+        with self._lock:
+            row = self._conn.execute("SELECT value, expires_at FROM responses WHERE key = ?", (key,)).fetchone()
+            if row and row[1] < time.time():
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+        return (json.loads(row[0]), row[1]) if row else None
+
+    def set(self, key: str, value: Any, expires_at: float):
+        blob = json.dumps(value, ensure_ascii=False)
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?)", (key, blob, expires_at))
+            self._conn.commit()
+
+
+# ---------------- Response Cache ----------------
+class ResponseCache:
+    """
+    Two-tier report cache: an in-process LRU with TTL in front of an optional
+    SQLite store. Concurrent misses for the same key share one upstream call.
+    """
+
+    def __init__(self, max_entries: int = 2048, ttl: float = 86400.0, db_path: Optional[str] = None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.disk = SQLiteStore(db_path) if db_path else None
+        self.stats = {"hits": 0, "disk_hits": 0, "misses": 0, "coalesced": 0, "evictions": 0, "expirations": 0}
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Task] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _memory_get(self, key: str):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at < time.time():
+            del self._entries[key]
+            self.stats["expirations"] += 1
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def _memory_set(self, key: str, value: Any, expires_at: float):
+        self._entries[key] = (value, expires_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    async def get(self, key: str):
+        value = self._memory_get(key)
+        if value is not None:
+            self.stats["hits"] += 1
+            return value
+        if self.disk:
+            entry = await asyncio.to_thread(self.disk.get, key)
+            if entry is not None:
+                self.stats["disk_hits"] += 1
+                self._memory_set(key, *entry)
+                return entry[0]
+        return None
+
+    async def set(self, key: str, value: Any):
+        expires_at = time.time() + self.ttl
+        self._memory_set(key, value, expires_at)
+        if self.disk:
+            await asyncio.to_thread(self.disk.set, key, value, expires_at)
+
+    async def get_or_compute(self, key: str, compute: Callable[[], Awaitable[Any]]) -> Any:
+        """Returns the cached value for `key`, or runs `compute` once for all concurrent callers."""
+        value = await self.get(key)
+        if value is not None:
+            return value
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self.stats["coalesced"] += 1
+        else:
+            self.stats["misses"] += 1
+            task = asyncio.ensure_future(self._fill(key, compute))
+            self._inflight[key] = task
+
+        # Shield so one caller disconnecting does not cancel the shared upstream call.
+        return await asyncio.shield(task)
+
+    async def _fill(self, key: str, compute: Callable[[], Awaitable[Any]]) -> Any:
+        try:
+            value = await compute()
+            await self.set(key, value)
+            return value
+        finally:
+            self._inflight.pop(key, None)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {**self.stats, "entries": len(self._entries), "inflight": len(self._inflight)}
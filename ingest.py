@@ -0,0 +1,234 @@
+import csv
+import io
+from typing import Any, Dict, Iterator, List, Mapping, Optional, Tuple, Union
+
+import numpy as np
+
+from prompt_builder import PromptBundle, build_prompt
+from schemas import BiomarkerRequest
+from scoring import FIELDS, gender_index, score_matrix, score_panel
+
+
+# ---------------- Columns ----------------
+# Every field except `gender` is numeric; columns are kept in schema order.
+COLUMNS = [name for name in BiomarkerRequest.model_fields if name != "gender"]
+COLUMN_INDEX = {name: i for i, name in enumerate(COLUMNS)}
+DEFAULTS = np.array([BiomarkerRequest.model_fields[name].default for name in COLUMNS], dtype=np.float64)
+DEFAULT_GENDER = BiomarkerRequest.model_fields["gender"].default
+INTEGER_COLUMNS = [name for name in COLUMNS if BiomarkerRequest.model_fields[name].annotation is int]
+
+# Plausibility bounds checked column-wise; measurements default to [0, inf).
+PLAUSIBLE_RANGES = {
+    "age": (0, 130),
+    "height": (30, 275),
+    "weight": (1, 650),
+}
+_LOW = np.array([PLAUSIBLE_RANGES.get(name, (0, np.inf))[0] for name in COLUMNS], dtype=np.float64)
+_HIGH = np.array([PLAUSIBLE_RANGES.get(name, (0, np.inf))[1] for name in COLUMNS], dtype=np.float64)
+_SCORING_COLUMNS = np.array([COLUMN_INDEX[name] for name in FIELDS], dtype=np.intp)
+
+
+# ---------------- Panel Frame ----------------
+class PanelFrame:
+    """
+    Array-backed batch of biomarker panels.
+
+    Numeric fields live in one (N, F) float64 matrix in `COLUMNS` order and
+    gender as small integer codes, so a panel costs ~F * 8 bytes instead of a
+    pydantic model and its dict. Invalid rows keep defaults and are listed in
+    `errors`. Models and prompts are only built on demand via `model(i)` and
+    `prompt(i)`.
+    """
+
+    def __init__(self, values: np.ndarray, gender_codes: np.ndarray, gender_labels: List[str], errors: Dict[int, str]):
+        self.values = values
+        self.gender_codes = gender_codes
+        self.gender_labels = gender_labels
+        self.errors = errors
+        self.valid = np.ones(len(values), dtype=bool)
+        self.valid[list(errors)] = False
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    @property
+    def nbytes(self) -> int:
+        return self.values.nbytes + self.gender_codes.nbytes + self.valid.nbytes
+
+    def genders(self) -> np.ndarray:
+        """Gender indices (0=male/1=female) as used by `score_matrix`."""
+        return np.array([gender_index(label) for label in self.gender_labels], dtype=np.intp)[self.gender_codes]
+
+    def score(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Scores every row at once (invalid rows score their defaults; mask with `valid`)."""
+        return score_matrix(self.values[:, _SCORING_COLUMNS], self.genders(), self.values[:, COLUMN_INDEX["age"]])
+
+    def model(self, index: int) -> BiomarkerRequest:
+        """Materializes one row; values were validated column-wise, so pydantic validation is skipped."""
+        if index in self.errors:
+            raise ValueError(self.errors[index])
+        fields: Dict[str, Any] = dict(zip(COLUMNS, self.values[index].tolist()))
+        for name in INTEGER_COLUMNS:
+            fields[name] = int(fields[name])
+        fields["gender"] = self.gender_labels[self.gender_codes[index]]
+        return BiomarkerRequest.model_construct(**fields)
+
+    def prompt(self, index: int) -> PromptBundle:
+        data = self.model(index)
+        return build_prompt(data, score_panel(data))
+
+    def items(self) -> Iterator[Union[BiomarkerRequest, ValueError]]:
+        """Yields each row as a model, or a ValueError for rows that failed validation."""
+        for index in range(len(self)):
+            yield ValueError(self.errors[index]) if index in self.errors else self.model(index)
+
+
+# ---------------- Column-wise Validation ----------------
+CHUNK_ROWS = 1024  # rows re-parsed cell by cell when a vectorized cast hits a bad cell
+
+
+def _to_float(column: np.ndarray, name: str, errors: Dict[int, str]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Converts one column to float64 with vectorized casts and returns it with a
+    mask of blank cells ("" or None). If the whole-column cast fails, it is
+    retried per chunk and only failing chunks are parsed cell by cell, so a few
+    blank or bad cells do not push the whole column onto the slow path.
+    """
+    blank = np.zeros(len(column), dtype=bool)
+    try:
+        return np.asarray(column, dtype=np.float64), blank
+    except (TypeError, ValueError):
+        pass
+    out = np.empty(len(column), dtype=np.float64)
+    for start in range(0, len(column), CHUNK_ROWS):
+        chunk = column[start:start + CHUNK_ROWS]
+        try:
+            out[start:start + CHUNK_ROWS] = np.asarray(chunk, dtype=np.float64)
+            continue
+        except (TypeError, ValueError):
+            pass
+        for offset, cell in enumerate(chunk.tolist()):
+            index = start + offset
+            if cell is None or cell == "":
+                out[index] = np.nan
+                blank[index] = True
+                continue
+            try:
+                out[index] = float(cell)
+            except (TypeError, ValueError):
+                out[index] = np.nan
+                errors.setdefault(index, f"{name}: input should be a valid number, got {cell!r}")
+    return out, blank
+
+
+def _range_error(name: str, value: float) -> str:
+    low, high = PLAUSIBLE_RANGES.get(name, (0, np.inf))
+    return f"{name}: {float(value)!r} is not a valid value in [{low}, {high}]"
+
+
+def check_panel(data: BiomarkerRequest) -> Optional[str]:
+    """
+    Applies the column-wise plausibility checks of `from_columns` to one
+    validated model, so per-object batch items are held to the same rules as
+    CSV rows. Returns the first error, or None.
+    """
+    row = np.array([getattr(data, name) for name in COLUMNS], dtype=np.float64)
+    bad = ~np.isfinite(row) | (row < _LOW) | (row > _HIGH)
+    if not bad.any():
+        return None
+    column = int(np.argmax(bad))
+    return _range_error(COLUMNS[column], row[column])
+
+
+def from_columns(columns: Mapping[str, Any], length: int, missing: Optional[Mapping[str, np.ndarray]] = None) -> PanelFrame:
+    """
+    Builds a PanelFrame from `field name → column` arrays of `length` rows.
+    Unknown columns are ignored and absent columns or cells (`missing` masks,
+    empty strings) take the schema defaults, matching `BiomarkerRequest`.
+    """
+    missing = missing or {}
+    errors: Dict[int, str] = {}
+    values = np.empty((length, len(COLUMNS)), dtype=np.float64)
+    values[:] = DEFAULTS
+
+    for name, column in columns.items():
+        if name not in COLUMN_INDEX:
+            continue
+        parsed, blank = _to_float(np.asarray(column), name, errors)
+        if name in missing:
+            blank |= missing[name]
+        values[:, COLUMN_INDEX[name]] = np.where(blank, DEFAULTS[COLUMN_INDEX[name]], parsed)
+
+    bad = ~np.isfinite(values) | (values < _LOW) | (values > _HIGH)
+    for name in INTEGER_COLUMNS:
+        column = values[:, COLUMN_INDEX[name]]
+        bad[:, COLUMN_INDEX[name]] |= np.isfinite(column) & (column != np.round(column))
+    for index, column in zip(*np.nonzero(bad)):
+        errors.setdefault(int(index), _range_error(COLUMNS[column], values[index, column]))
+
+    genders = columns.get("gender")
+    if genders is None:
+        genders = np.full(length, DEFAULT_GENDER, dtype=object)
+    else:
+        genders = np.asarray(genders, dtype=object)
+        blank = missing.get("gender", np.zeros(length, dtype=bool)) | np.equal(genders, None) | (genders == "")
+        genders[blank] = DEFAULT_GENDER
+        for index in np.nonzero(~np.vectorize(lambda g: isinstance(g, str), otypes=[bool])(genders))[0]:
+            errors.setdefault(int(index), f"gender: input should be a valid string, got {genders[index]!r}")
+            genders[index] = DEFAULT_GENDER
+    labels, codes = np.unique(genders.astype(str), return_inverse=True)
+
+    values[list(errors)] = DEFAULTS
+    return PanelFrame(values, codes.astype(np.int16), labels.tolist(), errors)
+
+
+# ---------------- Readers ----------------
+def read_csv(source: Union[str, io.TextIOBase]) -> PanelFrame:
+    """Reads a CSV (path or text stream) whose header names `BiomarkerRequest` fields; a UTF-8 BOM is ignored."""
+    if isinstance(source, str):
+        with open(source, newline="", encoding="utf-8-sig") as f:
+            return read_csv(f)
+    reader = csv.reader(source)
+    header = [name.strip() for name in next(reader, [])]
+    if header:
+        header[0] = header[0].lstrip("\ufeff").strip()  # streams decoded as plain utf-8 (e.g. Excel exports)
+    rows = [row for row in reader if row]  # blank lines (e.g. a trailing newline) are skipped, as csv.DictReader does
+    if any(len(row) != len(header) for row in rows):
+        raise ValueError("CSV rows must have one cell per header column.")
+    cells = np.array(rows, dtype=object).reshape(len(rows), len(header))
+    return from_columns({name: cells[:, j] for j, name in enumerate(header)}, len(rows))
+
+
+def from_records(records: np.ndarray) -> PanelFrame:
+    """Reads a NumPy structured array whose field names are `BiomarkerRequest` fields."""
+    return from_columns({name: records[name] for name in records.dtype.names}, len(records))
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow
+    except ImportError:
+        raise ImportError("❌ pyarrow is required for Arrow/Parquet ingestion: pip install pyarrow") from None
+    return pyarrow
+
+
+def from_arrow(table) -> PanelFrame:
+    """Reads a `pyarrow.Table` (or RecordBatch) with `BiomarkerRequest` field columns; nulls take defaults."""
+    _require_pyarrow()
+    columns, missing = {}, {}
+    for name in table.schema.names:
+        if name in COLUMN_INDEX or name == "gender":
+            column = table.column(name)
+            missing[name] = column.is_null().to_numpy(zero_copy_only=False)
+            columns[name] = column.to_numpy(zero_copy_only=False)
+    return from_columns(columns, table.num_rows, missing)
+
+
+def read_parquet(path: str) -> PanelFrame:
+    """Reads only the `BiomarkerRequest` columns of a Parquet file."""
+    _require_pyarrow()
+    import pyarrow.parquet as pq
+
+    wanted = set(COLUMNS) | {"gender"}
+    names = [name for name in pq.read_schema(path).names if name in wanted]
+    return from_arrow(pq.read_table(path, columns=names))
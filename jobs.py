@@ -0,0 +1,293 @@
+import asyncio
+import json
+import multiprocessing
+import os
+import signal
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Optional
+
+from dotenv import load_dotenv
+from pydantic import ValidationError
+
+from pipeline import create_model, generate_report
+from schemas import BiomarkerRequest
+from upstream import CircuitOpenError, is_retryable
+
+# ✅ Load environment variables
+load_dotenv()
+
+# ✅ Job Queue
+JOBS_DB_PATH = os.getenv("JOBS_DB_PATH", "jobs.db")                            # SQLite file holding the persistent queue
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))                               # worker processes started with the API, 0 = run `python jobs.py`
+JOB_WORKER_CONCURRENCY = int(os.getenv("JOB_WORKER_CONCURRENCY", "8"))         # concurrent jobs per worker process
+JOB_TIMEOUT_S = float(os.getenv("JOB_TIMEOUT_S", "300"))                       # max Gemini call + parse time per job
+JOB_LEASE_S = float(os.getenv("JOB_LEASE_S", "600"))                           # running jobs not finished by then are requeued
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))                     # runs (lease expiries + transient retries) before a job is failed
+JOB_POLL_INTERVAL_S = float(os.getenv("JOB_POLL_INTERVAL_S", "0.25"))          # idle worker / long-poll check interval
+JOB_RETRY_BACKOFF_S = float(os.getenv("JOB_RETRY_BACKOFF_S", "5"))              # first requeue delay after a transient error, doubled per attempt
+JOB_RETRY_BACKOFF_MAX_S = float(os.getenv("JOB_RETRY_BACKOFF_MAX_S", "300"))    # requeue delay ceiling
+
+FINISHED = ("done", "failed")
+
+
+# ---------------- Job Store ----------------
+class JobStore:
+    """
+    Persistent job queue in SQLite (WAL), shared by the API and worker processes.
+
+    Jobs are claimed by the highest `priority` first. Within a priority level,
+    tenants are served round-robin (least recently served tenant first), and
+    each tenant's jobs run oldest first. A claimed job holds a lease; if its
+    worker dies, the job is requeued once the lease expires, and jobs that hit
+    a transient upstream error are requeued with a delay (`not_before`). Both
+    count towards `max_attempts`, so queued and running jobs survive restarts
+    and upstream outages.
+    """
+
+    def __init__(self, path: str, lease: float = JOB_LEASE_S, max_attempts: int = JOB_MAX_ATTEMPTS):
+        self.lease = lease
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " id TEXT PRIMARY KEY, tenant TEXT NOT NULL, priority INTEGER NOT NULL, status TEXT NOT NULL,"
+            " payload TEXT NOT NULL, result TEXT, error TEXT, attempts INTEGER NOT NULL DEFAULT 0, worker TEXT,"
+            " created_at REAL NOT NULL, started_at REAL, finished_at REAL, lease_expires REAL, not_before REAL)"
+        )
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+        if "not_before" not in columns:  # queues created before delayed retries
+            self._conn.execute("ALTER TABLE jobs ADD COLUMN not_before REAL")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_queue ON jobs (status, priority, tenant, created_at)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS tenants (tenant TEXT PRIMARY KEY, last_served REAL NOT NULL)")
+
+    def submit(self, payload: str, tenant: str = "default", priority: int = 0, result: Any = None) -> str:
+        """Queues a job; with `result` the job is stored as already done (e.g. a cache hit)."""
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        if result is None:
+            row = (job_id, tenant, priority, "queued", payload, None, now, None)
+        else:
+            row = (job_id, tenant, priority, "done", payload, json.dumps(result, ensure_ascii=False), now, now)
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (id, tenant, priority, status, payload, result, created_at, finished_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                row,
+            )
+        return job_id
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, tenant, priority, status, result, error, attempts, created_at, started_at, finished_at"
+                " FROM jobs WHERE id = ?",
+                (job_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        keys = ("id", "tenant", "priority", "status", "result", "error", "attempts", "created_at", "started_at", "finished_at")
+        job = dict(zip(keys, row))
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+    def claim(self, worker: str) -> Optional[Dict[str, Any]]:
+        """Atomically moves the next job (priority, then tenant round-robin, then age) to `running`."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._reap_expired(now)
+                job = self._next_job(now)
+                if job is not None:
+                    self._conn.execute(
+                        "UPDATE jobs SET status = 'running', attempts = attempts + 1, worker = ?, started_at = ?,"
+                        " lease_expires = ? WHERE id = ?",
+                        (worker, now, now + self.lease, job["id"]),
+                    )
+                    self._conn.execute(
+                        "INSERT INTO tenants VALUES (?, ?) ON CONFLICT (tenant) DO UPDATE SET last_served = excluded.last_served",
+                        (job["tenant"], now),
+                    )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return job
+
+    def _next_job(self, now: float) -> Optional[Dict[str, Any]]:
+        ready = "status = 'queued' AND COALESCE(not_before, 0) <= ?"
+        priority = self._conn.execute(f"SELECT MAX(priority) FROM jobs WHERE {ready}", (now,)).fetchone()[0]
+        if priority is None:
+            return None
+        tenant = self._conn.execute(
+            f"SELECT q.tenant FROM (SELECT DISTINCT tenant FROM jobs WHERE {ready} AND priority = ?) q"
+            " LEFT JOIN tenants t ON t.tenant = q.tenant ORDER BY COALESCE(t.last_served, 0) LIMIT 1",
+            (now, priority),
+        ).fetchone()[0]
+        job_id, payload, attempts = self._conn.execute(
+            f"SELECT id, payload, attempts FROM jobs WHERE {ready} AND priority = ? AND tenant = ?"
+            " ORDER BY created_at LIMIT 1",
+            (now, priority, tenant),
+        ).fetchone()
+        return {"id": job_id, "tenant": tenant, "priority": priority, "payload": payload, "attempts": attempts + 1}
+
+    def _reap_expired(self, now: float):
+        """Requeues running jobs whose worker vanished, failing those out of attempts."""
+        self._conn.execute(
+            "UPDATE jobs SET status = 'failed', error = 'Worker lost the job too many times.', finished_at = ?"
+            " WHERE status = 'running' AND lease_expires < ? AND attempts >= ?",
+            (now, now, self.max_attempts),
+        )
+        self._conn.execute(
+            "UPDATE jobs SET status = 'queued', worker = NULL WHERE status = 'running' AND lease_expires < ?",
+            (now,),
+        )
+
+    def complete(self, job_id: str, result: Dict[str, Any]):
+        self._finish(job_id, "done", json.dumps(result, ensure_ascii=False), None)
+
+    def fail(self, job_id: str, error: str):
+        self._finish(job_id, "failed", None, error)
+
+    def retry(self, job_id: str, error: str, delay: float, consume: bool = True) -> bool:
+        """
+        Requeues a job after a transient error to run no sooner than `delay` seconds;
+        fails it once out of attempts. `consume=False` gives the attempt back (the
+        call never reached upstream, e.g. the circuit breaker was open).
+        """
+        now = time.time()
+        with self._lock:
+            requeued = self._conn.execute(
+                "UPDATE jobs SET status = 'queued', error = ?, worker = NULL, lease_expires = NULL, not_before = ?,"
+                " attempts = attempts - ? WHERE id = ? AND status = 'running' AND (attempts < ? OR ? = 1)",
+                (error, now + delay, 0 if consume else 1, job_id, self.max_attempts, 0 if consume else 1),
+            ).rowcount
+        if not requeued:
+            self._finish(job_id, "failed", None, error)
+        return bool(requeued)
+
+    def _finish(self, job_id: str, status: str, result: Optional[str], error: Optional[str]):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ?, lease_expires = NULL"
+                " WHERE id = ? AND status = 'running'",
+                (status, result, error, time.time(), job_id),
+            )
+
+    def release(self, workers: List[str]):
+        """Requeues jobs held by workers that were stopped before finishing them."""
+        with self._lock:
+            self._conn.executemany(
+                "UPDATE jobs SET status = 'queued', worker = NULL, attempts = attempts - 1"
+                " WHERE status = 'running' AND worker = ?",
+                [(worker,) for worker in workers],
+            )
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+
+
+# ---------------- Worker Process ----------------
+def worker_id(pid: int) -> str:
+    return f"{socket.gethostname()}:{pid}"
+
+
+def retry_delay(attempts: int) -> float:
+    """Backoff before re-running a job that failed transiently on its `attempts`-th try."""
+    return min(JOB_RETRY_BACKOFF_MAX_S, JOB_RETRY_BACKOFF_S * 2 ** max(0, attempts - 1))
+
+
+async def run_worker(db_path: str, model_factory: Callable[[], Any], concurrency: int, stop) -> None:
+    """Drains the queue with `concurrency` concurrent jobs until `stop` is set."""
+    store = JobStore(db_path)
+    model = model_factory()
+    me = worker_id(os.getpid())
+
+    async def runner():
+        while not stop.is_set():
+            job = await asyncio.to_thread(store.claim, me)
+            if job is None:
+                await asyncio.sleep(JOB_POLL_INTERVAL_S)
+                continue
+            try:
+                data = BiomarkerRequest.model_validate_json(job["payload"])
+            except ValidationError as e:
+                await asyncio.to_thread(store.fail, job["id"], f"Invalid job payload: {str(e)}")
+                continue
+            try:
+                report = await asyncio.wait_for(generate_report(model, data), JOB_TIMEOUT_S)
+            except asyncio.TimeoutError:
+                await asyncio.to_thread(
+                    store.retry, job["id"], f"Prediction timed out after {JOB_TIMEOUT_S}s", retry_delay(job["attempts"])
+                )
+            except CircuitOpenError as e:
+                await asyncio.to_thread(
+                    store.retry, job["id"], f"Upstream unavailable: {str(e)}", max(e.retry_after, JOB_POLL_INTERVAL_S), False
+                )
+            except Exception as e:
+                if is_retryable(e):
+                    await asyncio.to_thread(store.retry, job["id"], f"Prediction error: {str(e)}", retry_delay(job["attempts"]))
+                else:
+                    await asyncio.to_thread(store.fail, job["id"], f"Prediction error: {str(e)}")
+            else:
+                await asyncio.to_thread(store.complete, job["id"], report)
+
+    await asyncio.gather(*(runner() for _ in range(concurrency)))
+
+
+def worker_main(db_path: str, model_factory: Callable[[], Any], concurrency: int, stop) -> None:
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # the parent pool handles shutdown
+    asyncio.run(run_worker(db_path, model_factory, concurrency, stop))
+
+
+class JobWorkerPool:
+    """Starts and stops worker processes that drain the job queue."""
+
+    def __init__(self, db_path: str, processes: int, model_factory: Callable[[], Any], concurrency: int = JOB_WORKER_CONCURRENCY):
+        self.db_path = db_path
+        self.processes = processes
+        self.model_factory = model_factory
+        self.concurrency = concurrency
+        self._context = multiprocessing.get_context("spawn")
+        self._stop = self._context.Event()
+        self._workers: List[multiprocessing.Process] = []
+
+    def start(self):
+        for _ in range(self.processes):
+            process = self._context.Process(
+                target=worker_main,
+                args=(self.db_path, self.model_factory, self.concurrency, self._stop),
+                daemon=True,
+            )
+            process.start()
+            self._workers.append(process)
+
+    def stop(self, grace: float = 10.0):
+        """Lets workers finish their current jobs for up to `grace` seconds, then requeues the rest."""
+        self._stop.set()
+        deadline = time.monotonic() + grace
+        for process in self._workers:
+            process.join(max(0.0, deadline - time.monotonic()))
+            if process.is_alive():
+                process.terminate()
+                process.join()
+        JobStore(self.db_path).release([worker_id(process.pid) for process in self._workers])
+        self._workers = []
+
+
+if __name__ == "__main__":
+    # Standalone worker pool for deployments that run the API with JOB_WORKERS=0.
+    pool = JobWorkerPool(JOBS_DB_PATH, max(1, JOB_WORKERS), create_model)
+    pool.start()
+    try:
+        signal.pthread_sigmask(signal.SIG_BLOCK, {signal.SIGINT, signal.SIGTERM})
+        signal.sigwait({signal.SIGINT, signal.SIGTERM})
+    finally:
+        pool.stop()
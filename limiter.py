@@ -0,0 +1,79 @@
+import asyncio
+import time
+
+
+# ---------------- Errors ----------------
+class QueueFullError(Exception):
+    """Raised when the wait queue is already at its configured depth."""
+
+
+class QueueTimeoutError(Exception):
+    """Raised when a request waited too long for a free upstream slot."""
+
+
+# ---------------- Concurrency Limiter ----------------
+class ConcurrencyLimiter:
+    """
+    Bounds in-flight upstream calls with a semaphore and sheds load early.
+    Requests beyond `max_concurrency` wait in a queue of at most `max_queue_depth`
+    entries for up to `queue_timeout` seconds before being rejected.
+    """
+
+    def __init__(self, max_concurrency: int, max_queue_depth: int, queue_timeout: float):
+        self.max_concurrency = max_concurrency
+        self.max_queue_depth = max_queue_depth
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        self.waiting = 0
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def acquire(self, shed: bool = True):
+        """
+        Waits for a slot. With `shed=False` (background work that bounds its own
+        waiters) the wait is neither counted against the queue depth nor timed out.
+        """
+        if not shed:
+            await self._semaphore.acquire()
+            self.active += 1
+            return
+
+        if self._semaphore.locked() and self.waiting >= self.max_queue_depth:
+            raise QueueFullError(f"{self.waiting} requests already queued")
+
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            raise QueueTimeoutError(f"no upstream slot free after {self.queue_timeout}s") from None
+        finally:
+            self.waiting -= 1
+        self.active += 1
+
+    def release(self):
+        self.active -= 1
+        self._semaphore.release()
+
+
+# ---------------- Rate Limiter ----------------
+class TokenBucket:
+    """Async token bucket allowing `rate` acquisitions per second with bursts up to `burst`."""
+
+    def __init__(self, rate: float, burst: float = 0):
+        self.rate = rate
+        self.capacity = burst or max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        if self.rate <= 0:
+            return
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
@@ -0,0 +1,241 @@
+import math
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+
+# ---------------- Metric Types ----------------
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+TOKEN_BUCKETS = (100, 250, 500, 1000, 2000, 4000, 8000, 16000, 32000)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.label_names)
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        header = f"# HELP {self.name} {self.documentation}\n# TYPE {self.name} {self.kind}\n"
+        return header + "".join(line + "\n" for line in self.samples())
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        super().__init__(name, documentation, labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.label_names, key)} {_format_value(v)}" for key, v in items]
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        self._values: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][i] += 1
+                    break
+            state[1] += value
+            state[2] += 1
+
+    def samples(self) -> List[str]:
+        lines = []
+        with self._lock:
+            items = [(key, list(counts), total, count) for key, (counts, total, count) in self._values.items()]
+        for key, counts, total, count in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                le = _format_labels(self.label_names, key, f'le="{_format_value(bound)}"')
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.label_names, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.label_names, key)} {count}")
+        return lines
+
+
+class CallbackMetric(Metric):
+    """Reads its value(s) at scrape time, e.g. cache counters or limiter occupancy."""
+
+    def __init__(self, name: str, documentation: str, kind: str, read: Callable[[], float], labels: Sequence[str] = ()):
+        super().__init__(name, documentation, labels)
+        self.kind = kind
+        self._read = read
+
+    def samples(self) -> List[str]:
+        values = self._read()
+        if not isinstance(values, dict):
+            values = {(): values}
+        return [f"{self.name}{_format_labels(self.label_names, key)} {_format_value(v)}" for key, v in values.items()]
+
+
+# ---------------- Registry ----------------
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)."""
+        return "".join(metric.render() for metric in self._metrics.values())
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    "predict_stage_seconds", "Time spent in each pipeline stage.", ["stage"]
+))
+STAGE_ERRORS = REGISTRY.register(Counter(
+    "predict_stage_errors_total", "Pipeline failures by the stage that raised.", ["stage", "error"]
+))
+REQUEST_SECONDS = REGISTRY.register(Histogram(
+    "http_request_duration_seconds", "End-to-end HTTP request latency.", ["method", "path", "status"]
+))
+GEMINI_TOKENS = REGISTRY.register(Histogram(
+    "gemini_tokens_per_request", "Gemini usage_metadata token counts per call.", ["kind"], TOKEN_BUCKETS
+))
+PROMPT_TOKENS = REGISTRY.register(Histogram(
+    "prompt_tokens_estimated", "Estimated prompt tokens per built prompt (~4 characters per token).", ["part"], TOKEN_BUCKETS
+))
+GEMINI_TOKENS_TOTAL = REGISTRY.register(Counter(
+    "gemini_tokens_total", "Cumulative Gemini tokens by kind.", ["kind"]
+))
+
+
+# ---------------- Per-request Timing ----------------
+class RequestTimings:
+    """Stage durations for one request, rendered as a `Server-Timing` header."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages: List[Tuple[str, float]] = []
+
+    def add(self, name: str, seconds: float):
+        self.stages.append((name, seconds))
+
+    def server_timing(self) -> str:
+        entries = [f"{name};dur={seconds * 1000:.1f}" for name, seconds in self.stages]
+        entries.append(f"total;dur={(time.perf_counter() - self.started) * 1000:.1f}")
+        return ", ".join(entries)
+
+
+current_timings: ContextVar[Optional[RequestTimings]] = ContextVar("current_timings", default=None)
+
+
+def record_stage(name: str, seconds: float):
+    STAGE_SECONDS.observe(seconds, stage=name)
+    timings = current_timings.get()
+    if timings is not None:
+        timings.add(name, seconds)
+
+
+def mark_since_start(name: str):
+    """Records the time since the request started (e.g. body parsing + validation) as a stage."""
+    timings = current_timings.get()
+    if timings is not None:
+        record_stage(name, time.perf_counter() - timings.started)
+
+
+@contextmanager
+def stage(name: str):
+    """Times a pipeline stage; failures are counted against the stage that raised them."""
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception as e:
+        STAGE_ERRORS.inc(stage=name, error=type(e).__name__)
+        raise
+    finally:
+        record_stage(name, time.perf_counter() - start)
+
+
+class StageClock:
+    """
+    Times a stage that runs in several intervals, e.g. reading and parsing a
+    streamed response chunk by chunk, and records the total as one observation.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.seconds = 0.0
+        self.pending = False
+
+    @contextmanager
+    def running(self):
+        self.pending = True
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception as e:
+            STAGE_ERRORS.inc(stage=self.name, error=type(e).__name__)
+            raise
+        finally:
+            self.seconds += time.perf_counter() - start
+
+    def record(self):
+        """Records the time accumulated so far; a second call without new intervals does nothing."""
+        if self.pending:
+            self.pending = False
+            record_stage(self.name, self.seconds)
+
+
+def record_usage(usage_metadata):
+    """Records prompt/output/total token counts from a Gemini response's usage_metadata."""
+    if usage_metadata is None:
+        return
+    for kind, attribute in (("prompt", "prompt_token_count"), ("output", "candidates_token_count"), ("total", "total_token_count")):
+        count = getattr(usage_metadata, attribute, None)
+        if count:
+            GEMINI_TOKENS.observe(count, kind=kind)
+            GEMINI_TOKENS_TOTAL.inc(count, kind=kind)
@@ -0,0 +1,89 @@
+import hashlib
+from typing import Dict, Tuple
+
+import numpy as np
+
+from cache import ResponseCache
+from schemas import BiomarkerRequest
+from scoring import FIELDS, HIGH, LOW, SYSTEMS, PanelScore, age_band, panel_values
+
+
+# ---------------- Quantization ----------------
+# Each value is placed on its reference range: 0 is the low limit and `steps`
+# the high limit, so a bin spans 1/steps of the range width. Values further
+# than `MAX_WIDTHS` range widths outside the range share the outermost bin.
+MAX_WIDTHS = 4
+
+_FIELD_INDEX = {name: i for i, name in enumerate(FIELDS)}
+_SYSTEM_FIELDS = {system: np.array([_FIELD_INDEX[f] for f in fields], dtype=np.intp) for system, fields in SYSTEMS.items()}
+
+
+def quantize(values: np.ndarray, genders: np.ndarray, ages: np.ndarray, steps: int) -> np.ndarray:
+    """
+    Bins N panels at once (same inputs as `scoring.score_matrix`).
+    Returns (N, F) int16 bin numbers relative to each age/gender reference range.
+    """
+    bands = age_band(ages)
+    low = LOW[genders, bands]
+    width = np.maximum(HIGH[genders, bands] - low, 1e-9)
+    position = np.floor((values - low) / width * steps)
+    return np.clip(position, -MAX_WIDTHS * steps, (MAX_WIDTHS + 1) * steps).astype(np.int16)
+
+
+def system_signatures(data: BiomarkerRequest, score: PanelScore, steps: int, namespace: str) -> Dict[str, str]:
+    """
+    Keys for each flagged system's narrative: two panels share a key when the
+    system's fields fall in the same bins for the same gender and age band.
+    `namespace` separates model and prompt versions.
+    """
+    values, genders, ages = panel_values([data])
+    bins = quantize(values, genders, ages, steps)[0]
+    prefix = f"{namespace}|{genders[0]}|{int(age_band(ages)[0])}|"
+    return {
+        system: hashlib.blake2b(
+            (prefix + system).encode() + bins[_SYSTEM_FIELDS[system]].tobytes(), digest_size=16
+        ).hexdigest()
+        for system in score.flagged_systems
+    }
+
+
+# ---------------- Panel Index ----------------
+class PanelIndex:
+    """
+    Per-system reuse of `system_analysis` narratives across near-duplicate panels.
+
+    Entries live in a `ResponseCache`, which provides the O(1) lookup, LRU
+    eviction (`max_entries`), staleness (`ttl`) and an optional SQLite tier
+    shared across processes and restarts.
+    """
+
+    def __init__(self, steps: int = 4, max_entries: int = 1_000_000, ttl: float = 7 * 86400.0, db_path: str = None, namespace: str = ""):
+        self.steps = steps
+        self.namespace = namespace
+        self.store = ResponseCache(max_entries, ttl, db_path)
+        self.stats = {"requested": 0, "reused": 0}
+
+    def signatures(self, data: BiomarkerRequest, score: PanelScore) -> Dict[str, str]:
+        return system_signatures(data, score, self.steps, self.namespace)
+
+    async def lookup(self, data: BiomarkerRequest, score: PanelScore) -> Tuple[Dict[str, str], Dict[str, str]]:
+        """Returns (reused analyses by system, keys for the systems still to be generated)."""
+        reused, missing = {}, {}
+        for system, key in self.signatures(data, score).items():
+            analysis = await self.store.get(key)
+            if analysis is not None:
+                reused[system] = analysis
+            else:
+                missing[system] = key
+        self.stats["requested"] += len(reused) + len(missing)
+        self.stats["reused"] += len(reused)
+        return reused, missing
+
+    async def remember(self, keys: Dict[str, str], analysis: Dict[str, str]):
+        """Stores freshly generated narratives for the systems in `keys`."""
+        for system, key in keys.items():
+            if analysis.get(system):
+                await self.store.set(key, analysis[system])
+
+    def snapshot(self) -> Dict[str, int]:
+        return {**self.stats, "entries": len(self.store), "evictions": self.store.stats["evictions"]}
@@ -0,0 +1,160 @@
+import os
+from typing import Any, Dict
+
+from dotenv import load_dotenv
+
+from metrics import record_usage, stage
+from panel_index import PanelIndex
+from prompt_builder import JSON_SYSTEM_INSTRUCTION, PROMPT_VERSION, SYSTEM_INSTRUCTION, build_prompt
+from report_parser import IncrementalReportParser, StructuredStreamParser, parse_medical_report, parse_structured_report
+from schemas import RESPONSE_SCHEMA, BiomarkerRequest
+from scoring import merge_system_analysis, score_panel
+from upstream import CircuitBreaker, ResilientModel
+
+# ✅ Load environment variables
+load_dotenv()
+
+MODEL_ID = "gemini-2.5-flash"
+
+# ✅ Model Backend
+MODEL_BACKEND = os.getenv("MODEL_BACKEND", "gemini").lower()   # "gemini", "stub" (offline canned report), "record" or "replay"
+STUB_LATENCY_S = float(os.getenv("STUB_LATENCY_S", "1.0"))     # simulated response time of the stub backend
+REPLAY_CORPUS_PATH = os.getenv("REPLAY_CORPUS_PATH", "replay_corpus.jsonl")  # JSONL written by "record", served by "replay"
+REPLAY_SPEED = float(os.getenv("REPLAY_SPEED", "1.0"))         # multiplier on recorded latencies, 0 = no delay
+
+# ✅ Output Mode
+OUTPUT_MODE = os.getenv("OUTPUT_MODE", "markdown").lower()     # "markdown", or "json" for schema-constrained JSON output
+if OUTPUT_MODE not in ("markdown", "json"):
+    raise ValueError(f"❌ Unknown OUTPUT_MODE: {OUTPUT_MODE!r}")
+
+# Cache and index keys: reports from the two modes come from different prompts.
+REPORT_VERSION = PROMPT_VERSION if OUTPUT_MODE == "markdown" else f"{PROMPT_VERSION}-json"
+
+# ✅ Upstream Resilience
+UPSTREAM_MAX_RETRIES = int(os.getenv("UPSTREAM_MAX_RETRIES", "2"))              # retries on retryable Gemini errors
+UPSTREAM_BACKOFF_BASE_S = float(os.getenv("UPSTREAM_BACKOFF_BASE_S", "0.5"))     # first backoff ceiling, doubled per retry
+UPSTREAM_BACKOFF_MAX_S = float(os.getenv("UPSTREAM_BACKOFF_MAX_S", "8"))         # backoff ceiling
+UPSTREAM_HEDGE_QUANTILE = float(os.getenv("UPSTREAM_HEDGE_QUANTILE", "0.95"))    # hedge after this latency quantile, 0 = off
+UPSTREAM_HEDGE_MIN_SAMPLES = int(os.getenv("UPSTREAM_HEDGE_MIN_SAMPLES", "20"))  # latencies needed before hedging
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))     # consecutive failures that open the circuit
+CIRCUIT_RESET_S = float(os.getenv("CIRCUIT_RESET_S", "30"))                      # fast-fail period before a probe call
+
+circuit = CircuitBreaker(CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_RESET_S)
+
+# ✅ Near-duplicate Reuse (opt-in: reused narratives may quote a neighbouring panel's exact values)
+PANEL_INDEX_ENABLED = os.getenv("PANEL_INDEX_ENABLED", "false").lower() in ("1", "true", "yes")
+PANEL_INDEX_STEPS = int(os.getenv("PANEL_INDEX_STEPS", "4"))                   # bins per reference-range width
+PANEL_INDEX_MAX_ENTRIES = int(os.getenv("PANEL_INDEX_MAX_ENTRIES", "1000000"))  # in-process system narratives
+PANEL_INDEX_TTL_S = float(os.getenv("PANEL_INDEX_TTL_S", "604800"))            # narrative staleness limit
+PANEL_INDEX_DB_PATH = os.getenv("PANEL_INDEX_DB_PATH")                         # optional SQLite tier shared by workers
+
+panel_index = PanelIndex(
+    PANEL_INDEX_STEPS, PANEL_INDEX_MAX_ENTRIES, PANEL_INDEX_TTL_S, PANEL_INDEX_DB_PATH, f"{MODEL_ID}|{REPORT_VERSION}"
+) if PANEL_INDEX_ENABLED else None
+
+
+# ---------------- Model ----------------
+def create_backend():
+    """
+    Builds the configured model backend. The Gemini SDK is imported and
+    configured here rather than at import time, so importing the app stays
+    cheap and does not need an API key.
+    """
+    if MODEL_BACKEND == "stub":
+        from stub_model import SAMPLE_JSON_REPORT, SAMPLE_REPORT, StubModel
+
+        return StubModel(latency=STUB_LATENCY_S, report=SAMPLE_JSON_REPORT if OUTPUT_MODE == "json" else SAMPLE_REPORT)
+
+    if MODEL_BACKEND == "replay":
+        from replay import ReplayModel
+
+        return ReplayModel(REPLAY_CORPUS_PATH, speed=REPLAY_SPEED)
+
+    if MODEL_BACKEND not in ("gemini", "record"):
+        raise ValueError(f"❌ Unknown MODEL_BACKEND: {MODEL_BACKEND!r}")
+
+    # ✅ Fetch Gemini API Key
+    api_key = os.getenv("GEMINI_API_KEY")
+    if not api_key:
+        raise ValueError("❌ GEMINI_API_KEY not found. Please set it in your .env or environment variables.")
+
+    # ✅ Configure Gemini Client
+    import google.generativeai as genai
+
+    genai.configure(api_key=api_key)
+    if OUTPUT_MODE == "json":
+        model = genai.GenerativeModel(
+            MODEL_ID,
+            system_instruction=JSON_SYSTEM_INSTRUCTION,
+            generation_config=genai.GenerationConfig(response_mime_type="application/json", response_schema=RESPONSE_SCHEMA),
+        )
+    else:
+        model = genai.GenerativeModel(MODEL_ID, system_instruction=SYSTEM_INSTRUCTION)
+
+    if MODEL_BACKEND == "record":
+        from replay import RecordingModel
+
+        return RecordingModel(model, REPLAY_CORPUS_PATH)
+    return model
+
+
+def create_model() -> ResilientModel:
+    """Builds the shared model backend behind the resilient upstream wrapper."""
+    return ResilientModel(
+        create_backend(),
+        circuit,
+        max_retries=UPSTREAM_MAX_RETRIES,
+        backoff_base=UPSTREAM_BACKOFF_BASE_S,
+        backoff_max=UPSTREAM_BACKOFF_MAX_S,
+        hedge_quantile=UPSTREAM_HEDGE_QUANTILE,
+        hedge_min_samples=UPSTREAM_HEDGE_MIN_SAMPLES,
+    )
+
+
+# ---------------- Parsing ----------------
+def parse_report(text: str) -> Dict[str, Any]:
+    """Parses and cleans a full response for the configured output mode."""
+    if OUTPUT_MODE == "json":
+        return parse_structured_report(text, clean=True)
+    return parse_medical_report(text, clean=True)
+
+
+def create_stream_parser():
+    """Section parser for streamed responses (JSON mode emits all sections at the end)."""
+    return StructuredStreamParser() if OUTPUT_MODE == "json" else IncrementalReportParser()
+
+
+# ---------------- Pipeline ----------------
+async def generate_report(model, data: BiomarkerRequest) -> Dict[str, Any]:
+    """Builds the prompt, calls Gemini asynchronously and returns the cleaned report."""
+    # --- Local Pre-screen ---
+    with stage("prescreen"):
+        score = score_panel(data)
+
+    # --- Near-duplicate Reuse (per system) ---
+    reused, missing = {}, {}
+    if panel_index is not None:
+        with stage("index"):
+            reused, missing = await panel_index.lookup(data, score)
+
+    # --- Prompt (static system instruction lives on the model) ---
+    with stage("prompt"):
+        prompt = build_prompt(data, score, reused)
+
+    # --- Gemini Call ---
+    with stage("gemini"):
+        response = await model.generate_content_async(prompt.user_message)
+
+        if not response or not getattr(response, "text", None):
+            raise ValueError("Empty response from Gemini model.")
+
+    record_usage(getattr(response, "usage_metadata", None))
+    report_text = response.text.strip()
+
+    # --- Parse + Clean (single pass) ---
+    with stage("parse"):
+        report = parse_report(report_text)
+        if panel_index is not None:
+            await panel_index.remember(missing, report["system_analysis"])
+        report["system_analysis"] = merge_system_analysis(score, {**reused, **report["system_analysis"]})
+    return report
@@ -0,0 +1,166 @@
+import math
+import re
+from typing import Collection, Dict, Tuple
+
+from pydantic import BaseModel
+
+from metrics import PROMPT_TOKENS
+from schemas import FIELD_SECTIONS, BiomarkerRequest
+from scoring import SYSTEMS, PanelScore
+
+
+PROMPT_VERSION = "4"  # bump whenever the prompt changes so cached reports are not reused
+CHARS_PER_TOKEN = 4   # rough Gemini tokenizer ratio for English/markdown prompts
+
+
+# ---------------- Static System Instruction ----------------
+# Identical for every request, so it is sent once per model as `system_instruction`
+# and forms a stable prefix that Gemini's context caching can reuse.
+_INPUT_NOTE = """Patient results are given as "Marker value unit [flag]". Markers that are not listed were at their reference defaults and within range.
+"""
+
+SYSTEM_INSTRUCTION = """You are an advanced **Medical Insight Generation AI** trained to analyze **biomarkers and lab results**.
+⚠️ IMPORTANT — OUTPUT FORMAT INSTRUCTIONS:
+Return your report in this strict markdown structure.
+------------------------------
+### Executive Summary
+**Top Health Priorities:**
+1. ...
+2. ...
+3. ...
+make it more detailed 
+**Key Strengths:**
+- ...
+- ...
+make it detailed
+------------------------------
+### System-Specific Analysis
+**<System name exactly as listed under "Systems to Analyze">**
+Status: <Normal | Borderline | Abnormal>. Explanation: make it detailed
+(repeat for every system listed under "Systems to Analyze" and only those; systems under "Already Analyzed" have an existing analysis and all other systems were pre-screened as normal. Omit this section if no systems are listed)
+### Personalized Action Plan
+**Nutrition:** 
+make it detailed
+**Lifestyle:** 
+make it detailed
+**Testing:** 
+make it detailed
+**Medical Consultation:** 
+make it detailed
+------------------------------
+### Interaction Alerts
+- ...
+- ...
+make it detailed
+
+""" + _INPUT_NOTE
+
+# OUTPUT_MODE=json: the structure comes from the response schema, so only the content is described.
+JSON_SYSTEM_INSTRUCTION = """You are an advanced **Medical Insight Generation AI** trained to analyze **biomarkers and lab results**.
+Return a JSON object that follows the response schema:
+- executive_summary.top_priorities: the three most important health priorities, each explained in detail.
+- executive_summary.key_strengths: the patient's key strengths, each explained in detail.
+- system_analysis: one item per system listed under "Systems to Analyze" and only those, with `system` spelled exactly as listed and `analysis` written as "Status: <Normal | Borderline | Abnormal>. Explanation: <detailed explanation>". Systems under "Already Analyzed" have an existing analysis and all other systems were pre-screened as normal; use an empty list if no systems are listed.
+- personalized_action_plan: detailed nutrition, lifestyle, testing and medical_consultation advice.
+- interaction_alerts: detailed alerts about interactions between the abnormal markers.
+Write plain text inside the strings, without markdown.
+
+""" + _INPUT_NOTE
+
+
+# ---------------- Field Metadata ----------------
+_UNIT_SUFFIX = re.compile(r"^(.*?)(?: in (\S+)| \(([^()\s]+)\))$")
+
+
+def split_description(description: str) -> Tuple[str, str]:
+    """Splits a field description such as "Urea (S) in mg/dL" or "LDH (U/L)" into (label, unit)."""
+    match = _UNIT_SUFFIX.match(description)
+    if not match:
+        return description, ""
+    return match.group(1), match.group(2) or match.group(3)
+
+
+FIELD_LABELS: Dict[str, Tuple[str, str]] = {
+    name: split_description(field.description or name) for name, field in BiomarkerRequest.model_fields.items()
+}
+FIELD_DEFAULTS = {name: field.default for name, field in BiomarkerRequest.model_fields.items()}
+SYSTEM_INSTRUCTION_TOKENS = math.ceil(len(SYSTEM_INSTRUCTION) / CHARS_PER_TOKEN)
+
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+# ---------------- Dynamic User Message ----------------
+class PromptBundle(BaseModel):
+    """Per-request prompt plus estimated input-token counts."""
+    user_message: str
+    system_tokens: int
+    user_tokens: int
+
+    @property
+    def total_tokens(self) -> int:
+        return self.system_tokens + self.user_tokens
+
+
+def _render_value(name: str, value, flag: str = "") -> str:
+    label, unit = FIELD_LABELS[name]
+    text = f"{label} {value:g}" if isinstance(value, float) else f"{label} {value}"
+    if unit:
+        text += f" {unit}"
+    if flag:
+        text += f" [{flag}]"
+    return text
+
+
+def _system_line(system: str, score: PanelScore) -> str:
+    flags = ", ".join(f"{FIELD_LABELS[f][0]} {score.fields[f]}" for f in SYSTEMS[system] if f in score.fields)
+    return f"- {system} ({score.systems[system]}: {flags})"
+
+
+def render_user_message(data: BiomarkerRequest, score: PanelScore, reused: Collection[str] = ()) -> str:
+    """
+    Renders flagged systems, patient info and only the non-default or out-of-range markers.
+    Systems in `reused` already have an analysis and are listed for context only.
+    """
+    to_analyze = [system for system in score.flagged_systems if system not in reused]
+    lines = ["**Systems to Analyze**"]
+    lines.extend(_system_line(system, score) for system in to_analyze)
+    if not to_analyze:
+        lines.append("- None: all systems were pre-screened as normal." if not reused else "- None.")
+    if reused:
+        lines.append("")
+        lines.append("**Already Analyzed** (consider in the summary and plan; do not write their analysis)")
+        lines.extend(_system_line(system, score) for system in score.flagged_systems if system in reused)
+
+    lines.append("")
+    lines.append("**Patient**")
+    lines.append(f"Age {data.age} years; Gender {data.gender}; Height {data.height:g} cm; Weight {data.weight:g} kg")
+
+    lines.append("")
+    lines.append("**Results**")
+    for section, fields in FIELD_SECTIONS.items():
+        if section == "Patient Info":
+            continue
+        rendered = [
+            _render_value(name, getattr(data, name), score.fields.get(name, ""))
+            for name in fields
+            if name in score.fields or getattr(data, name) != FIELD_DEFAULTS[name]
+        ]
+        if rendered:
+            lines.append(f"{section}: " + "; ".join(rendered))
+    return "\n".join(lines)
+
+
+def build_prompt(data: BiomarkerRequest, score: PanelScore, reused: Collection[str] = ()) -> PromptBundle:
+    """Builds the dynamic part of the prompt; the static part is `SYSTEM_INSTRUCTION`."""
+    user_message = render_user_message(data, score, reused)
+    bundle = PromptBundle(
+        user_message=user_message,
+        system_tokens=SYSTEM_INSTRUCTION_TOKENS,
+        user_tokens=estimate_tokens(user_message),
+    )
+    PROMPT_TOKENS.observe(bundle.system_tokens, part="system")
+    PROMPT_TOKENS.observe(bundle.user_tokens, part="user")
+    PROMPT_TOKENS.observe(bundle.total_tokens, part="total")
+    return bundle
@@ -0,0 +1,197 @@
+import asyncio
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from stub_model import StubResponse
+from upstream import chunk_text
+
+
+# ---------------- Corpus Format ----------------
+# One JSON object per line:
+#   {"key": blake2b of the prompt, "latency": seconds, "first_chunk": seconds or null,
+#    "text": full response text, "usage": {prompt/candidates/total token counts},
+#    "error": null or {"type": exception class, "code": HTTP status}}
+USAGE_FIELDS = ("prompt_token_count", "candidates_token_count", "total_token_count")
+
+
+def prompt_key(contents) -> str:
+    return hashlib.blake2b(str(contents).encode(), digest_size=16).hexdigest()
+
+
+def load_corpus(path: str) -> List[Dict[str, Any]]:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+class RecordedUsage:
+    """`usage_metadata` rebuilt from a corpus record."""
+
+    def __init__(self, usage: Dict[str, int]):
+        for name in USAGE_FIELDS:
+            setattr(self, name, usage.get(name, 0))
+
+
+# ---------------- Recording ----------------
+class RecordingModel:
+    """
+    Wraps the real Gemini model and appends every call (response text, usage,
+    latency, time to first streamed chunk, errors) to a JSONL corpus for
+    `ReplayModel`. Each record is written with a single append, so several
+    uvicorn workers can share one corpus file.
+    """
+
+    def __init__(self, model, path: str):
+        self.model = model
+        self.path = path
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def _write(self, contents, latency: float, text: str = "", usage=None, first_chunk: float = None, error: Exception = None):
+        record = {
+            "key": prompt_key(contents),
+            "latency": round(latency, 4),
+            "first_chunk": None if first_chunk is None else round(first_chunk, 4),
+            "text": text,
+            "usage": {name: getattr(usage, name, 0) for name in USAGE_FIELDS} if usage is not None else None,
+            "error": None if error is None else {"type": type(error).__name__, "code": getattr(error, "code", None)},
+        }
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(line)
+
+    def generate_content(self, contents, **kwargs):
+        self.calls += 1
+        start = time.perf_counter()
+        try:
+            response = self.model.generate_content(contents, **kwargs)
+        except Exception as e:
+            self._write(contents, time.perf_counter() - start, error=e)
+            raise
+        self._write(contents, time.perf_counter() - start, response.text, getattr(response, "usage_metadata", None))
+        return response
+
+    async def generate_content_async(self, contents, stream: bool = False, **kwargs):
+        self.calls += 1
+        start = time.perf_counter()
+        try:
+            response = await self.model.generate_content_async(contents, stream=stream, **kwargs)
+        except Exception as e:
+            self._write(contents, time.perf_counter() - start, error=e)
+            raise
+        if stream:
+            return self._record_stream(contents, response, start)
+        self._write(contents, time.perf_counter() - start, response.text, getattr(response, "usage_metadata", None))
+        return response
+
+    async def _record_stream(self, contents, response, start: float):
+        parts, usage, first_chunk = [], None, None
+        try:
+            async for chunk in response:
+                if first_chunk is None:
+                    first_chunk = time.perf_counter() - start
+                parts.append(chunk_text(chunk))
+                usage = getattr(chunk, "usage_metadata", None) or usage
+                yield chunk
+        except Exception as e:
+            self._write(contents, time.perf_counter() - start, "".join(parts), usage, first_chunk, e)
+            raise
+        self._write(contents, time.perf_counter() - start, "".join(parts), usage, first_chunk)
+
+
+# ---------------- Replay ----------------
+class ReplayModel:
+    """
+    Serves recorded responses with their recorded latencies, so `/predict`
+    can be load-tested without Gemini quota.
+
+    A prompt seen while recording gets its own response back. Any other prompt
+    (e.g. synthetic load-test panels) gets a random successful record, and its
+    latency is drawn from the empirical distribution of all recorded calls.
+    Recorded errors are replayed at their recorded rate. `speed` scales every
+    latency (0 = no delay).
+    """
+
+    def __init__(self, path: str, speed: float = 1.0, seed: int = None):
+        records = load_corpus(path)
+        self.responses = [r for r in records if r["error"] is None and r["text"]]
+        if not self.responses:
+            raise ValueError(f"❌ Replay corpus {path!r} has no successful responses.")
+        self.by_key: Dict[str, List[Dict[str, Any]]] = {}
+        for record in self.responses:
+            self.by_key.setdefault(record["key"], []).append(record)
+        self.latencies = [r["latency"] for r in records]
+        self.errors = [r for r in records if r["error"] is not None]
+        self.error_rate = len(self.errors) / len(records)
+        self.speed = speed
+        self.calls = 0
+        self._rng = random.Random(seed)
+
+    def _pick(self, contents) -> Dict[str, Any]:
+        matches = self.by_key.get(prompt_key(contents))
+        if matches:
+            return self._rng.choice(matches)
+        return {**self._rng.choice(self.responses), "latency": self._rng.choice(self.latencies)}
+
+    def _maybe_fail(self):
+        if self.error_rate and self._rng.random() < self.error_rate:
+            error = self._rng.choice(self.errors)["error"]
+            from google.api_core import exceptions as api_exceptions
+
+            code = error.get("code") or 503
+            raise api_exceptions.from_http_status(code, f"Replayed {error['type']}")
+
+    @staticmethod
+    def _response(record: Dict[str, Any], text: str, last: bool = True) -> StubResponse:
+        usage = RecordedUsage(record["usage"]) if last and record.get("usage") else None
+        return StubResponse(text, usage)
+
+    def generate_content(self, contents, **kwargs) -> StubResponse:
+        self.calls += 1
+        record = self._pick(contents)
+        time.sleep(record["latency"] * self.speed)
+        self._maybe_fail()
+        return self._response(record, record["text"])
+
+    async def generate_content_async(self, contents, stream: bool = False, **kwargs):
+        self.calls += 1
+        record = self._pick(contents)
+        if stream:
+            self._maybe_fail()
+            return self._stream(record)
+        await asyncio.sleep(record["latency"] * self.speed)
+        self._maybe_fail()
+        return self._response(record, record["text"])
+
+    async def _stream(self, record: Dict[str, Any], chunk_size: int = 200):
+        """Yields the first chunk at the recorded time to first chunk and spreads the rest over the remaining latency."""
+        text = record["text"]
+        chunks = [text[i:i + chunk_size] for i in range(0, len(text), chunk_size)]
+        latency = record["latency"] * self.speed
+        first = min(record.get("first_chunk") or record["latency"] / len(chunks), record["latency"]) * self.speed
+        await asyncio.sleep(first)
+        for i, chunk in enumerate(chunks):
+            if i:
+                await asyncio.sleep((latency - first) / (len(chunks) - 1))
+            yield self._response(record, chunk, i == len(chunks) - 1)
+
+
+def write_corpus(path: str, texts: List[str], latencies: List[float], first_chunk: Optional[float] = None):
+    """Writes a corpus from plain response texts and latencies (one record per latency, texts reused in turn)."""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        for i, latency in enumerate(latencies):
+            text = texts[i % len(texts)]
+            record = {
+                "key": prompt_key(f"synthetic-{i}"),
+                "latency": round(latency, 4),
+                "first_chunk": first_chunk,
+                "text": text,
+                "usage": None,
+                "error": None,
+            }
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
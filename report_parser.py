@@ -0,0 +1,252 @@
+import re
+from typing import Any, Dict, Iterator, List, Tuple, Union
+
+from pydantic import ValidationError
+
+from metrics import REGISTRY, Counter
+from schemas import StructuredReport
+
+
+# ---------------- Precompiled Patterns ----------------
+_DASH_RUN = re.compile(r"-{3,}")
+_WHITESPACE = re.compile(r"\s+")
+_BULLET = re.compile(r"[\-\*\u2022]+\s*")
+_HEADER_RUN = re.compile(r"#{3,}")
+_BOLD_ENTITY = re.compile(r"\*\*(.*?)\*\*(.*?)(?=\*\*|###|$)", re.S)
+_PRIORITY = re.compile(r"\d+\.\s*(.*?)\n")
+_KEY_STRENGTHS = re.compile(r"\*\*Key Strengths:\*\*(.*)", re.S)
+
+SECTION_HEADERS = {
+    "executive_summary": re.compile(r"\s*Executive Summary", re.I),
+    "system_analysis": re.compile(r"\s*System[- ]Specific Analysis", re.I),
+    "personalized_action_plan": re.compile(r"\s*Personalized Action Plan", re.I),
+    "interaction_alerts": re.compile(r"\s*Interaction Alerts", re.I),
+}
+
+
+# ---------------- Cleaning Utility ----------------
+def clean_text(text: str) -> str:
+    """Removes separators, collapses whitespace and trims list artifacts from one string."""
+    if "---" in text:
+        text = _DASH_RUN.sub("", text)
+    # str.split() uses the same Unicode whitespace as `\s`, so this equals
+    # `_WHITESPACE.sub(" ", text)` before the strip, at a fraction of the cost.
+    return " ".join(text.split()).strip(" -\n\t\r")
+
+
+def clean_json(data: Union[Dict, List, str]) -> Union[Dict, List, str]:
+    """Recursively removes separators, extra whitespace, and artifacts from all string values."""
+    if isinstance(data, str):
+        return clean_text(data)
+    elif isinstance(data, list):
+        return [cleaned for cleaned in (clean_json(i) for i in data if i) if cleaned]
+    elif isinstance(data, dict):
+        return {k.strip(): clean_json(v) for k, v in data.items()}
+    return data
+
+
+def clean_line(line: str) -> str:
+    return _BULLET.sub("", line.strip())
+
+
+def empty_report() -> Dict[str, Any]:
+    return {
+        "executive_summary": {"top_priorities": [], "key_strengths": []},
+        "system_analysis": {},
+        "personalized_action_plan": {},
+        "interaction_alerts": []
+    }
+
+
+# ---------------- Section Parsers ----------------
+# Each parser takes `clean=True` to apply `clean_json` while building values,
+# producing exactly `clean_json(parser(block))` without a second traversal.
+def _clean_items(items: List[str]) -> List[str]:
+    return [cleaned for cleaned in (clean_text(i) for i in items if i) if cleaned]
+
+
+def _bullet_lines(block: str) -> List[str]:
+    return [line for line in map(clean_line, block.splitlines()) if line]
+
+
+def parse_bold_entities(block: str, clean: bool = False) -> Dict[str, str]:
+    """Extracts **bold** entities and maps text until next bold or section."""
+    entities = {}
+    for match in _BOLD_ENTITY.finditer(block):
+        key = match.group(1).strip().strip(":")
+        if key:
+            if clean:
+                entities[key] = clean_text(match.group(2))
+            else:
+                entities[key] = _WHITESPACE.sub(" ", match.group(2).strip().replace("\n", " "))
+    return {k.strip(): v for k, v in entities.items()} if clean else entities
+
+
+def parse_executive_summary(block: str, clean: bool = False) -> Dict[str, List[str]]:
+    summary = {"top_priorities": [], "key_strengths": []}
+    priorities = [clean_line(p) for p in _PRIORITY.findall(block)]
+    if priorities:
+        summary["top_priorities"] = priorities
+    strengths_match = _KEY_STRENGTHS.search(block)
+    if strengths_match:
+        summary["key_strengths"] = _bullet_lines(strengths_match.group(1))
+    if clean:
+        summary = {key: _clean_items(items) for key, items in summary.items()}
+    return summary
+
+
+def parse_interaction_alerts(block: str, clean: bool = False) -> List[str]:
+    alerts = _bullet_lines(block)
+    return _clean_items(alerts) if clean else alerts
+
+
+SECTION_PARSERS = {
+    "executive_summary": parse_executive_summary,
+    "system_analysis": parse_bold_entities,
+    "personalized_action_plan": parse_bold_entities,
+    "interaction_alerts": parse_interaction_alerts,
+}
+
+
+def parse_section(name: str, block: str, clean: bool = False) -> Any:
+    """Parses the body of one `###` section into its structured value."""
+    return SECTION_PARSERS[name](block, clean)
+
+
+# ---------------- Section Scanner ----------------
+def match_section(segment: str, seen: set) -> Union[Tuple[str, str], None]:
+    """Matches a segment (text after a `###` run) against the section headers not yet seen."""
+    for name, header in SECTION_HEADERS.items():
+        if name not in seen:
+            match = header.match(segment)
+            if match:
+                return name, segment[match.end():]
+    return None
+
+
+def iter_sections(text: str) -> Iterator[Tuple[str, str]]:
+    """
+    Splits the report into `(name, block)` pairs in one linear scan over the
+    `###` header runs. Only the first occurrence of each section is returned,
+    and a block ends at the next header run or at the end of the text.
+    """
+    seen = set()
+    runs = _HEADER_RUN.finditer(text)
+    run = next(runs, None)
+    while run is not None:
+        nxt = next(runs, None)
+        if nxt is not None:
+            segment = text[run.end():nxt.start()]
+        else:
+            segment = text[run.end():]
+            # A regex `$` also matches before a single trailing newline.
+            if segment.endswith("\n"):
+                segment = segment[:-1]
+        section = match_section(segment, seen)
+        if section:
+            seen.add(section[0])
+            yield section
+        run = nxt
+
+
+# ---------------- Parser ----------------
+def parse_medical_report(text: str, clean: bool = False):
+    """
+    Parses Gemini markdown response → structured JSON.
+    Detects section headers, **bold keys**, and table entries.
+    With `clean=True` the result equals `clean_json(parse_medical_report(text))`.
+    """
+    data = empty_report()
+    for name, block in iter_sections(text):
+        data[name] = parse_section(name, block, clean)
+    return data
+
+
+# ---------------- Incremental Parser ----------------
+class IncrementalReportParser:
+    """
+    Parses a streamed report section by section. A section is complete once the
+    next `###` header starts (or the stream ends), at which point `feed`/`close`
+    return it as a cleaned `(name, value)` pair.
+    """
+
+    def __init__(self):
+        self._buffer = ""
+        self._emitted = set()
+
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        self._buffer += chunk
+        runs = list(_HEADER_RUN.finditer(self._buffer))
+        if len(runs) < 2:
+            return []
+        segments = [self._buffer[run.end():nxt.start()] for run, nxt in zip(runs, runs[1:])]
+        self._buffer = self._buffer[runs[-1].start():]
+        return [event for segment in segments for event in self._parse_segment(segment)]
+
+    def close(self) -> List[Tuple[str, Any]]:
+        """Flushes the final section and returns defaults for any section never seen."""
+        run = _HEADER_RUN.search(self._buffer)
+        events = self._parse_segment(self._buffer[run.end():].rstrip()) if run else []
+        self._buffer = ""
+        for name, value in empty_report().items():
+            if name not in self._emitted:
+                self._emitted.add(name)
+                events.append((name, value))
+        return events
+
+    def _parse_segment(self, segment: str) -> List[Tuple[str, Any]]:
+        section = match_section(segment, self._emitted)
+        if not section:
+            return []
+        name, block = section
+        self._emitted.add(name)
+        return [(name, parse_section(name, block, clean=True))]
+
+
+# ---------------- Structured (JSON mode) Parser ----------------
+STRUCTURED_FALLBACKS = REGISTRY.register(Counter(
+    "report_structured_fallbacks_total", "JSON-mode responses that were not JSON and were parsed as markdown."
+))
+
+
+def parse_structured_report(text: str, clean: bool = False) -> Dict[str, Any]:
+    """
+    Validates a JSON-mode response with the `StructuredReport` model (a single
+    pass in pydantic-core, no regexes). Only text that is not JSON at all, e.g.
+    markdown from a model that ignored the mime type, goes to
+    `parse_medical_report`. Raises ValueError for JSON that does not match the
+    schema and for text neither parser finds any section in, so the caller
+    does not cache an empty report.
+    """
+    try:
+        report = StructuredReport.model_validate_json(text).to_report()
+    except ValidationError as e:
+        first = e.errors()[0]
+        if first["type"] != "json_invalid":
+            location = ".".join(map(str, first["loc"]))
+            raise ValueError(f"Structured report does not match the schema: {location}: {first['msg']}") from None
+        STRUCTURED_FALLBACKS.inc()
+        report = parse_medical_report(text, clean)
+        if report == empty_report():
+            raise ValueError("Response is neither a structured nor a markdown report.") from None
+        return report
+    return clean_json(report) if clean else report
+
+
+class StructuredStreamParser:
+    """
+    `IncrementalReportParser` counterpart for JSON mode. Partial JSON cannot be
+    validated, so the response is buffered and every section is returned by `close`.
+    """
+
+    def __init__(self):
+        self._parts: List[str] = []
+
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        self._parts.append(chunk)
+        return []
+
+    def close(self) -> List[Tuple[str, Any]]:
+        report = parse_structured_report("".join(self._parts).strip(), clean=True)
+        self._parts = []
+        return list(report.items())
@@ -0,0 +1,243 @@
+from typing import Any, Dict, List, Type
+
+from pydantic import BaseModel,Field
+
+
+# ---------------- Schema ----------------
+class BiomarkerRequest(BaseModel):
+    # ---------------- Patient Info ----------------
+    age: int = Field(default=52, description="Patient age in years")
+    gender: str = Field(default="female", description="Gender of the patient")
+    height: float = Field(default=165, description="Height in cm")
+    weight: float = Field(default=70, description="Weight in kg")
+
+    # ---------------- Kidney Function ----------------
+    urea: float = Field(default=30.0, description="Urea (S) in mg/dL")
+    creatinine: float = Field(default=1.0, description="Creatinine (S) in mg/dL")
+    uric_acid: float = Field(default=5.0, description="Uric Acid (S) in mg/dL")
+    calcium: float = Field(default=9.5, description="Calcium (S) in mg/dL")
+    phosphorus: float = Field(default=3.5, description="Phosphorus (S) in mg/dL")
+    sodium: float = Field(default=140.0, description="Sodium (S) in mEq/L")
+    potassium: float = Field(default=4.2, description="Potassium (S) in mEq/L")
+    chloride: float = Field(default=102.0, description="Chloride (S) in mEq/L")
+    amylase: float = Field(default=70.0, description="Amylase (S) in U/L")
+    lipase: float = Field(default=35.0, description="Lipase (S) in U/L")
+    bicarbonate: float = Field(default=24.0, description="Bicarbonate (S) in mEq/L")
+    egfr: float = Field(default=100.0, description="Estimated GFR (S) in mL/min/1.73m²")
+    serum_osmolality: float = Field(default=290.0, description="Serum Osmolality (S) in mOsm/kg")
+    ionized_calcium: float = Field(default=1.25, description="Ionized Calcium (S) in mmol/L")
+    
+    # ---------------- Basic Check-up ----------------
+    wbc: float = Field(default=6.0, description="White Blood Cell count (×10^3/μL)")
+    hemoglobin: float = Field(default=14.0, description="Hemoglobin (g/dL)")
+    mcv: float = Field(default=90.0, description="Mean Corpuscular Volume (fL)")
+    rdw: float = Field(default=13.5, description="Red Cell Distribution Width (%)")
+    lymphocytes: float = Field(default=30.0, description="Lymphocyte percentage (%)")
+    
+    # ---------------- Diabetic Profile ----------------
+    fasting_blood_sugar: float = Field(default=85.0, description="Fasting Blood Sugar (mg/dL)")
+    hb1ac: float = Field(default=5.4, description="HbA1c (%)")
+    insulin: float = Field(default=10.0, description="Insulin (µIU/mL)")
+    c_peptide: float = Field(default=1.2, description="C-Peptide (ng/mL)")
+    homa_ir: float = Field(default=1.2, description="HOMA-IR")
+    
+    # ---------------- Lipid Profile ----------------
+    total_cholesterol: float = Field(default=180.0, description="Total Cholesterol (mg/dL)")
+    ldl: float = Field(default=90.0, description="LDL Cholesterol (mg/dL)")
+    hdl: float = Field(default=50.0, description="HDL Direct (mg/dL)")
+    cholesterol_hdl_ratio: float = Field(default=3.0, description="Cholesterol/HDL Ratio")
+    triglycerides: float = Field(default=120.0, description="Triglycerides (mg/dL)")
+    apo_a1: float = Field(default=140.0, description="Apo A-1 (mg/dL)")
+    apo_b: float = Field(default=70.0, description="Apo B (mg/dL)")
+    apo_ratio: float = Field(default=0.5, description="Apo B : Apo A-1 ratio")
+    
+    # ---------------- Liver Function ----------------
+    albumin: float = Field(default=4.2, description="Albumin (g/dL)")
+    total_protein: float = Field(default=7.0, description="Total Protein (g/dL)")
+    alt: float = Field(default=25.0, description="ALT (U/L)")
+    ast: float = Field(default=24.0, description="AST (U/L)")
+    alp: float = Field(default=120.0, description="ALP (U/L)")
+    ggt: float = Field(default=20.0, description="GGT (U/L)")
+    ld: float = Field(default=180.0, description="LDH (U/L)")
+    globulin: float = Field(default=3.0, description="Globulin (g/dL)")
+    albumin_globulin_ratio: float = Field(default=1.4, description="Albumin/Globulin Ratio")
+    magnesium: float = Field(default=2.0, description="Magnesium (mg/dL)")
+    total_bilirubin: float = Field(default=0.7, description="Total Bilirubin (mg/dL)")
+    direct_bilirubin: float = Field(default=0.3, description="Direct Bilirubin (mg/dL)")
+    indirect_bilirubin: float = Field(default=0.4, description="Indirect Bilirubin (mg/dL)")
+    ammonia: float = Field(default=35.0, description="Ammonia (NH3) (µmol/L)")
+    
+    # ---------------- Cardiac Profile ----------------
+    hs_crp: float = Field(default=1.0, description="High-Sensitivity CRP (mg/L)")
+    ck: float = Field(default=150.0, description="Creatine Kinase (U/L)")
+    ck_mb: float = Field(default=20.0, description="CK-MB (U/L)")
+    homocysteine: float = Field(default=10.0, description="Homocysteine (µmol/L)")
+    
+    # ---------------- Mineral & Heavy Metal ----------------
+    zinc: float = Field(default=90.0, description="Zinc (µg/dL)")
+    copper: float = Field(default=100.0, description="Copper (µg/dL)")
+    selenium: float = Field(default=120.0, description="Selenium (µg/L)")
+    
+    # ---------------- Iron Profile ----------------
+    iron: float = Field(default=100.0, description="Iron (µg/dL)")
+    tibc: float = Field(default=300.0, description="TIBC (µg/dL)")
+    transferrin: float = Field(default=250.0, description="Transferrin (mg/dL)")
+    
+    # ---------------- Vitamins ----------------
+    vitamin_d: float = Field(default=35.0, description="Vitamin D (ng/mL)")
+    vitamin_b12: float = Field(default=500.0, description="Vitamin B12 (pg/mL)")
+    
+    # ---------------- Hormone Profile ----------------
+    total_testosterone: float = Field(default=450.0, description="Total Testosterone (ng/dL)")
+    free_testosterone: float = Field(default=15.0, description="Free Testosterone (pg/mL)")
+    estrogen: float = Field(default=60.0, description="Estrogen / Estradiol (pg/mL)")
+    progesterone: float = Field(default=1.0, description="Progesterone (ng/mL)")
+    dhea_s: float = Field(default=250.0, description="DHEA-S (µg/dL)")
+    shbg: float = Field(default=40.0, description="SHBG (nmol/L)")
+    lh: float = Field(default=5.0, description="LH (IU/L)")
+    fsh: float = Field(default=6.0, description="FSH (IU/L)")
+    
+    # ---------------- Thyroid Profile ----------------
+    tsh: float = Field(default=2.0, description="TSH (µIU/mL)")
+    free_t3: float = Field(default=3.2, description="Free T3 (pg/mL)")
+    free_t4: float = Field(default=1.2, description="Free T4 (ng/dL)")
+    total_t3: float = Field(default=120.0, description="Total T3 (ng/dL)")
+    total_t4: float = Field(default=8.0, description="Total T4 (µg/dL)")
+    reverse_t3: float = Field(default=15.0, description="Reverse T3 (ng/dL)")
+    tpo_ab: float = Field(default=5.0, description="Thyroid Antibodies – TPO Ab (IU/mL)")
+    tg_ab: float = Field(default=3.0, description="Thyroid Antibodies – TG Ab (IU/mL)")
+    
+    # ---------------- Adrenal / Stress / Other Hormones ----------------
+    cortisol: float = Field(default=12.0, description="Cortisol (µg/dL)")
+    acth: float = Field(default=25.0, description="ACTH (pg/mL)")
+    igf1: float = Field(default=200.0, description="IGF-1 (ng/mL)")
+    leptin: float = Field(default=10.0, description="Leptin (ng/mL)")
+    adiponectin: float = Field(default=10.0, description="Adiponectin (µg/mL)")
+    
+    # ---------------- Blood Marker Cancer Profile ----------------
+    ca125: float = Field(default=20.0, description="CA125 (U/mL)")
+    ca15_3: float = Field(default=25.0, description="CA15-3 (U/mL)")
+    ca19_9: float = Field(default=30.0, description="CA19-9 (U/mL)")
+    psa: float = Field(default=1.0, description="PSA (ng/mL)")
+    cea: float = Field(default=2.0, description="CEA (ng/mL)")
+    calcitonin: float = Field(default=5.0, description="Calcitonin (pg/mL)")
+    afp: float = Field(default=5.0, description="AFP (ng/mL)")
+    tnf: float = Field(default=2.0, description="Tumor Necrosis Factor (pg/mL)")
+    
+    # ---------------- Immune Profile ----------------
+    ana: float = Field(default=0.5, description="ANA (IU/mL)")
+    ige: float = Field(default=100.0, description="IgE (IU/mL)")
+    igg: float = Field(default=1200.0, description="IgG (mg/dL)")
+    anti_ccp: float = Field(default=10.0, description="Anti-CCP (U/mL)")
+    dsdna: float = Field(default=0.5, description="dsDNA (IU/mL)")
+    ssa_ssb: float = Field(default=5.0, description="SSA/SSB (IU/mL)")
+    rnp: float = Field(default=1.0, description="RNP (IU/mL)")
+    sm_antibodies: float = Field(default=0.5, description="Sm Antibodies (IU/mL)")
+    anca: float = Field(default=0.5, description="ANCA (IU/mL)")
+    anti_ena: float = Field(default=0.5, description="Anti-ENA (IU/mL)")
+    il6: float = Field(default=3.0, description="IL-6 (pg/mL)")
+    allergy_panel: float = Field(default=10.0, description="Comprehensive Allergy Profile (IgE & Food Sensitivity IgG)")
+
+
+# ---------------- Field Sections ----------------
+# Input groupings of `BiomarkerRequest`, mirroring the blocks above.
+FIELD_SECTIONS = {
+    "Patient Info": ["age", "gender", "height", "weight"],
+    "Kidney Function": ["urea", "creatinine", "uric_acid", "calcium", "phosphorus", "sodium", "potassium", "chloride", "amylase", "lipase", "bicarbonate", "egfr", "serum_osmolality", "ionized_calcium"],
+    "Basic Check-up": ["wbc", "hemoglobin", "mcv", "rdw", "lymphocytes"],
+    "Diabetic Profile": ["fasting_blood_sugar", "hb1ac", "insulin", "c_peptide", "homa_ir"],
+    "Lipid Profile": ["total_cholesterol", "ldl", "hdl", "cholesterol_hdl_ratio", "triglycerides", "apo_a1", "apo_b", "apo_ratio"],
+    "Liver Function": ["albumin", "total_protein", "alt", "ast", "alp", "ggt", "ld", "globulin", "albumin_globulin_ratio", "magnesium", "total_bilirubin", "direct_bilirubin", "indirect_bilirubin", "ammonia"],
+    "Cardiac Profile": ["hs_crp", "ck", "ck_mb", "homocysteine"],
+    "Mineral & Heavy Metal": ["zinc", "copper", "selenium"],
+    "Iron Profile": ["iron", "tibc", "transferrin"],
+    "Vitamins": ["vitamin_d", "vitamin_b12"],
+    "Hormone Profile": ["total_testosterone", "free_testosterone", "estrogen", "progesterone", "dhea_s", "shbg", "lh", "fsh"],
+    "Thyroid Profile": ["tsh", "free_t3", "free_t4", "total_t3", "total_t4", "reverse_t3", "tpo_ab", "tg_ab"],
+    "Adrenal / Stress / Other Hormones": ["cortisol", "acth", "igf1", "leptin", "adiponectin"],
+    "Blood Marker Cancer Profile": ["ca125", "ca15_3", "ca19_9", "psa", "cea", "calcitonin", "afp", "tnf"],
+    "Immune Profile": ["ana", "ige", "igg", "anti_ccp", "dsdna", "ssa_ssb", "rnp", "sm_antibodies", "anca", "anti_ena", "il6", "allergy_panel"],
+}
+
+
+# ---------------- Structured Report ----------------
+# Response schema for OUTPUT_MODE=json. Gemini schemas cannot describe free-form
+# object keys, so per-system analyses are a list of {system, analysis} items;
+# `to_report` converts back to the shape returned by the markdown parser.
+class ExecutiveSummary(BaseModel):
+    top_priorities: List[str]
+    key_strengths: List[str]
+
+
+class SystemAnalysis(BaseModel):
+    system: str
+    analysis: str
+
+
+class ActionPlan(BaseModel):
+    nutrition: str
+    lifestyle: str
+    testing: str
+    medical_consultation: str
+
+
+ACTION_PLAN_LABELS = {
+    "nutrition": "Nutrition",
+    "lifestyle": "Lifestyle",
+    "testing": "Testing",
+    "medical_consultation": "Medical Consultation",
+}
+
+
+class StructuredReport(BaseModel):
+    executive_summary: ExecutiveSummary
+    system_analysis: List[SystemAnalysis]
+    personalized_action_plan: ActionPlan
+    interaction_alerts: List[str]
+
+    def to_report(self) -> Dict[str, Any]:
+        return {
+            "executive_summary": self.executive_summary.model_dump(),
+            "system_analysis": {item.system: item.analysis for item in self.system_analysis},
+            "personalized_action_plan": {
+                ACTION_PLAN_LABELS[name]: text for name, text in self.personalized_action_plan.model_dump().items()
+            },
+            "interaction_alerts": self.interaction_alerts,
+        }
+
+    @classmethod
+    def from_report(cls, report: Dict[str, Any]) -> "StructuredReport":
+        """Inverse of `to_report`, e.g. to turn a parsed markdown report into its JSON-mode equivalent."""
+        plan = report["personalized_action_plan"]
+        return cls(
+            executive_summary=report["executive_summary"],
+            system_analysis=[{"system": system, "analysis": text} for system, text in report["system_analysis"].items()],
+            personalized_action_plan={name: plan.get(label, "") for name, label in ACTION_PLAN_LABELS.items()},
+            interaction_alerts=report["interaction_alerts"],
+        )
+
+
+def gemini_schema(model: Type[BaseModel]) -> Dict[str, Any]:
+    """
+    OpenAPI-subset dict for Gemini's `response_schema`, keeping `required`.
+    google-generativeai 0.7.2 drops `required` when given a pydantic class,
+    which lets Gemini omit any field.
+    """
+    schema = model.model_json_schema()
+    defs = schema.get("$defs", {})
+
+    def convert(node: Dict[str, Any]) -> Dict[str, Any]:
+        if "$ref" in node:
+            node = defs[node["$ref"].rsplit("/", 1)[1]]
+        out = {"type": node["type"]}
+        if "properties" in node:
+            out["properties"] = {name: convert(prop) for name, prop in node["properties"].items()}
+            out["required"] = list(node.get("required", []))
+        if "items" in node:
+            out["items"] = convert(node["items"])
+        return out
+
+    return convert(schema)
+
+
+RESPONSE_SCHEMA = gemini_schema(StructuredReport)
@@ -0,0 +1,315 @@
+import numpy as np
+from pydantic import BaseModel
+from typing import Dict, List, Sequence
+
+from schemas import BiomarkerRequest
+
+
+# ---------------- Reference Ranges ----------------
+# Adult reference intervals in the units used by `BiomarkerRequest`.
+# A spec is either (low, high), a per-gender dict, or a list with one
+# (low, high) per entry of AGE_BANDS; per-gender values may also be age lists.
+AGE_BANDS = (40, 60)  # <40, 40-59, 60+
+GENDERS = ("male", "female")
+
+REFERENCE_RANGES = {
+    # ---------------- Kidney Function ----------------
+    "urea": (15, 45),
+    "creatinine": {"male": (0.7, 1.3), "female": (0.5, 1.1)},
+    "uric_acid": {"male": (3.5, 7.2), "female": (2.6, 6.0)},
+    "calcium": (8.5, 10.5),
+    "phosphorus": (2.5, 4.5),
+    "sodium": (135, 145),
+    "potassium": (3.5, 5.1),
+    "chloride": (98, 107),
+    "amylase": (28, 100),
+    "lipase": (13, 60),
+    "bicarbonate": (22, 29),
+    "egfr": [(90, 200), (75, 200), (60, 200)],
+    "serum_osmolality": (275, 295),
+    "ionized_calcium": (1.12, 1.32),
+
+    # ---------------- Basic Check-up ----------------
+    "wbc": (4.0, 11.0),
+    "hemoglobin": {"male": (13.5, 17.5), "female": (12.0, 15.5)},
+    "mcv": (80, 100),
+    "rdw": (11.5, 14.5),
+    "lymphocytes": (20, 40),
+
+    # ---------------- Diabetic Profile ----------------
+    "fasting_blood_sugar": (70, 99),
+    "hb1ac": (4.0, 5.6),
+    "insulin": (2.0, 20.0),
+    "c_peptide": (0.8, 3.1),
+    "homa_ir": (0.5, 2.5),
+
+    # ---------------- Lipid Profile ----------------
+    "total_cholesterol": (125, 200),
+    "ldl": (0, 100),
+    "hdl": {"male": (40, 100), "female": (50, 100)},
+    "cholesterol_hdl_ratio": (0, 5.0),
+    "triglycerides": (0, 150),
+    "apo_a1": {"male": (110, 180), "female": (120, 200)},
+    "apo_b": (0, 100),
+    "apo_ratio": (0, 0.8),
+
+    # ---------------- Liver Function ----------------
+    "albumin": (3.5, 5.0),
+    "total_protein": (6.0, 8.3),
+    "alt": (7, 40),
+    "ast": (8, 40),
+    "alp": (44, 147),
+    "ggt": {"male": (8, 61), "female": (5, 36)},
+    "ld": (140, 280),
+    "globulin": (2.0, 3.5),
+    "albumin_globulin_ratio": (1.1, 2.5),
+    "magnesium": (1.7, 2.2),
+    "total_bilirubin": (0.1, 1.2),
+    "direct_bilirubin": (0.0, 0.3),
+    "indirect_bilirubin": (0.1, 1.0),
+    "ammonia": (15, 45),
+
+    # ---------------- Cardiac Profile ----------------
+    "hs_crp": (0, 3.0),
+    "ck": {"male": (39, 308), "female": (26, 192)},
+    "ck_mb": (0, 25),
+    "homocysteine": (5, 15),
+
+    # ---------------- Mineral & Heavy Metal ----------------
+    "zinc": (60, 120),
+    "copper": {"male": (70, 140), "female": (80, 155)},
+    "selenium": (70, 150),
+
+    # ---------------- Iron Profile ----------------
+    "iron": {"male": (65, 175), "female": (50, 170)},
+    "tibc": (250, 450),
+    "transferrin": (200, 360),
+
+    # ---------------- Vitamins ----------------
+    "vitamin_d": (30, 100),
+    "vitamin_b12": (200, 900),
+
+    # ---------------- Hormone Profile ----------------
+    "total_testosterone": {"male": (300, 1000), "female": (15, 70)},
+    "free_testosterone": {"male": (50, 210), "female": (1.0, 8.5)},
+    "estrogen": {"male": (10, 40), "female": [(15, 350), (10, 350), (0, 40)]},
+    "progesterone": {"male": (0.2, 1.4), "female": [(0.1, 25), (0.1, 25), (0, 1.0)]},
+    "dhea_s": {"male": [(280, 640), (100, 500), (40, 300)], "female": [(65, 380), (35, 256), (15, 200)]},
+    "shbg": {"male": (10, 57), "female": (18, 144)},
+    "lh": {"male": (1.5, 9.3), "female": [(1.9, 14.6), (1.9, 60), (10, 60)]},
+    "fsh": {"male": (1.5, 12.4), "female": [(2.5, 10.2), (2.5, 100), (20, 140)]},
+
+    # ---------------- Thyroid Profile ----------------
+    "tsh": (0.4, 4.0),
+    "free_t3": (2.3, 4.2),
+    "free_t4": (0.8, 1.8),
+    "total_t3": (80, 200),
+    "total_t4": (5.0, 12.0),
+    "reverse_t3": (9.2, 24.1),
+    "tpo_ab": (0, 34),
+    "tg_ab": (0, 4),
+
+    # ---------------- Adrenal / Stress / Other Hormones ----------------
+    "cortisol": (6, 23),
+    "acth": (7.2, 63),
+    "igf1": [(115, 355), (90, 290), (70, 220)],
+    "leptin": {"male": (2, 10), "female": (4, 25)},
+    "adiponectin": {"male": (4, 26), "female": (5, 37)},
+
+    # ---------------- Blood Marker Cancer Profile ----------------
+    "ca125": (0, 35),
+    "ca15_3": (0, 30),
+    "ca19_9": (0, 37),
+    "psa": {"male": [(0, 2.5), (0, 3.5), (0, 6.5)], "female": (0, 4.0)},
+    "cea": (0, 3.0),
+    "calcitonin": {"male": (0, 10), "female": (0, 5)},
+    "afp": (0, 8.3),
+    "tnf": (0, 8.1),
+
+    # ---------------- Immune Profile ----------------
+    "ana": (0, 1.0),
+    "ige": (0, 100),
+    "igg": (700, 1600),
+    "anti_ccp": (0, 20),
+    "dsdna": (0, 10),
+    "ssa_ssb": (0, 20),
+    "rnp": (0, 20),
+    "sm_antibodies": (0, 20),
+    "anca": (0, 3.5),
+    "anti_ena": (0, 20),
+    "il6": (0, 7),
+    "allergy_panel": (0, 100),
+}
+
+# Values this far outside a range (as a fraction of its width) are borderline, beyond it abnormal.
+BORDERLINE_MARGIN = 0.1
+
+
+# ---------------- Report Systems ----------------
+SYSTEMS = {
+    "Kidney Function Test": ["urea", "creatinine", "egfr", "uric_acid", "sodium", "potassium", "chloride", "phosphorus", "calcium", "ionized_calcium", "bicarbonate", "serum_osmolality", "amylase", "lipase"],
+    "Basic Check-up (CBC & Hematology)": ["hemoglobin", "mcv", "rdw", "wbc", "lymphocytes"],
+    "Hormone Profile (Comprehensive)": ["total_testosterone", "free_testosterone", "shbg", "estrogen", "progesterone", "lh", "fsh", "dhea_s"],
+    "Liver Function Test": ["alt", "ast", "alp", "ggt", "ld", "total_bilirubin", "direct_bilirubin", "indirect_bilirubin", "albumin", "globulin", "total_protein", "albumin_globulin_ratio", "ammonia"],
+    "Diabetic Profile": ["fasting_blood_sugar", "hb1ac", "insulin", "c_peptide", "homa_ir"],
+    "Lipid Profile": ["total_cholesterol", "ldl", "hdl", "triglycerides", "apo_a1", "apo_b", "apo_ratio", "cholesterol_hdl_ratio"],
+    "Cardiac Profile": ["hs_crp", "ck", "ck_mb", "homocysteine"],
+    "Mineral & Heavy Metal": ["zinc", "copper", "selenium", "magnesium"],
+    "Iron Profile": ["iron", "tibc", "transferrin"],
+    "Bone Health": ["vitamin_d", "calcium", "phosphorus", "magnesium", "alp"],
+    "Vitamins": ["vitamin_d", "vitamin_b12"],
+    "Thyroid Profile": ["tsh", "free_t4", "free_t3", "total_t3", "total_t4", "reverse_t3", "tpo_ab", "tg_ab"],
+    "Adrenal Function / Stress Hormones / Other Hormones": ["cortisol", "acth", "dhea_s", "igf1", "leptin", "adiponectin"],
+    "Blood Marker Cancer Profile": ["cea", "ca19_9", "ca125", "ca15_3", "afp", "psa", "calcitonin", "tnf"],
+    "Immune Profile": ["igg", "ige", "ana", "anti_ena", "ssa_ssb", "rnp", "sm_antibodies", "dsdna", "anti_ccp", "anca", "il6", "allergy_panel"],
+}
+
+# Narratives used verbatim for systems the pre-screen finds entirely normal.
+NORMAL_NARRATIVES = {
+    "Kidney Function Test": (
+        "Status: Normal. Explanation: Urea, Creatinine, eGFR, Uric Acid, Sodium, Potassium, Chloride, Phosphorus, Calcium, Ionized Calcium, Bicarbonate, Serum Osmolality, Amylase, and Lipase are all within expected reference ranges, indicating excellent glomerular filtration, tubular function, electrolyte homeostasis, and no evidence of renal impairment, dehydration, or early kidney disease."
+    ),
+    "Basic Check-up (CBC & Hematology)": (
+        "Status: Normal. Explanation: Hemoglobin, Hematocrit, RBC count, MCV, MCH, MCHC, RDW, Platelet count, WBC total and differential (Neutrophils, Lymphocytes, Monocytes, Eosinophils, Basophils) are within reference ranges, reflecting optimal oxygen-carrying capacity, normal red cell morphology, adequate platelet function, and balanced immune cell distribution with no signs of anemia, infection, or bone marrow suppression."
+    ),
+    "Hormone Profile (Comprehensive)": (
+        "Status: Normal. Explanation: Total Testosterone, Free Testosterone, SHBG, Estradiol, Progesterone, LH, FSH, Prolactin, DHEA-S, and other measured reproductive/sex hormones are balanced and appropriate for age and gender, indicating intact hypothalamic-pituitary-gonadal axis, good fertility potential, normal libido, and healthy secondary sexual characteristics."
+    ),
+    "Liver Function Test": (
+        "Status: Normal. Explanation: ALT, AST, ALP, GGT, LDH, Total Bilirubin, Direct & Indirect Bilirubin, Albumin, Globulin, Total Protein, Albumin/Globulin Ratio, and Ammonia are within reference ranges, demonstrating intact hepatocyte integrity, normal synthetic function, protein metabolism, and biliary excretion with no evidence of hepatic injury, cholestasis, cirrhosis, or metabolic liver disease."
+    ),
+    "Diabetic Profile": (
+        "Status: Normal. Explanation: Fasting Blood Glucose, HbA1c, Fasting Insulin, C-Peptide, and HOMA-IR are all within optimal ranges, confirming excellent glycemic control, high insulin sensitivity, proper pancreatic beta-cell function, and very low risk of prediabetes or type 2 diabetes."
+    ),
+    "Lipid Profile": (
+        "Status: Normal. Explanation: Total Cholesterol, LDL-C, HDL-C, Triglycerides, Non-HDL Cholesterol, Apo A-1, Apo B, Apo B/Apo A-1 Ratio, and Cholesterol/HDL Ratio are optimal, indicating low atherogenic risk, excellent cardiovascular protection, and minimal likelihood of plaque formation or coronary artery disease."
+    ),
+    "Cardiac Profile": (
+        "Status: Normal. Explanation: hs-CRP, CK, CK-MB, Homocysteine, NT-proBNP (if measured), and other cardiac injury/inflammation markers are within normal limits, reflecting minimal systemic inflammation, healthy myocardial tissue, low thrombotic risk, and excellent long-term cardiovascular prognosis."
+    ),
+    "Mineral & Heavy Metal": (
+        "Status: Normal. Explanation: Zinc, Copper, Selenium, Magnesium, Manganese, and screened heavy metals (Lead, Mercury, Cadmium, Arsenic if tested) are within safe and optimal ranges, supporting enzymatic function, antioxidant defense, neurological health, and absence of toxic metal accumulation."
+    ),
+    "Iron Profile": (
+        "Status: Normal. Explanation: Serum Iron, TIBC, Transferrin Saturation, Ferritin, and Soluble Transferrin Receptor are balanced, indicating healthy iron stores, normal transport capacity, and no evidence of iron deficiency anemia, hemochromatosis, or chronic inflammation-related anemia."
+    ),
+    "Bone Health": (
+        "Status: Normal. Explanation: Vitamin D (25-OH), Calcium, Phosphorus, Magnesium, Alkaline Phosphatase (bone isoform if available), PTH, and bone turnover markers (if tested) are optimal, supporting strong bone mineralization, healthy remodeling, and low risk of osteoporosis or osteomalacia."
+    ),
+    "Vitamins": (
+        "Status: Normal. Explanation: Vitamin D (25-OH), Vitamin B12, Folate, Vitamin B6, Vitamin C, Vitamin A, Vitamin E, and Vitamin K (if measured) are within optimal ranges, ensuring robust immune function, neurological health, methylation, antioxidant protection, and prevention of deficiency-related disorders."
+    ),
+    "Thyroid Profile": (
+        "Status: Normal. Explanation: TSH, Free T4, Free T3, Total T3, Total T4, Reverse T3, Anti-TPO Antibodies, and Anti-Thyroglobulin Antibodies are all within reference limits, confirming euthyroid status, normal hormone production and conversion, and absence of autoimmune thyroid disease."
+    ),
+    "Adrenal Function / Stress Hormones / Other Hormones": (
+        "Status: Normal. Explanation: Morning Cortisol, ACTH, DHEA-S, IGF-1, Leptin, Adiponectin, Aldosterone (if tested), and Catecholamines/Metonephrines (if tested) are appropriately balanced, indicating resilient HPA axis, healthy stress response, growth hormone axis integrity, and optimal metabolic regulation."
+    ),
+    "Blood Marker Cancer Profile": (
+        "Status: Normal. Explanation: CEA, CA19-9, CA125, CA15-3, AFP, PSA (men), HE4, ROMA score (if applicable), Calcitonin, and other tumor markers are within reference ranges, suggesting very low probability of active malignancy at this time (note: tumor markers are not screening tools and must be interpreted in clinical context)."
+    ),
+    "Immune Profile": (
+        "Status: Normal. Explanation: Immunoglobulin levels (IgG, IgA, IgM, IgE), ANA, ENA panel, Anti-dsDNA, Anti-CCP, ANCA, Complement C3/C4, IL-6, and lymphocyte subsets (if tested) are within normal limits, indicating competent humoral and cellular immunity with no evidence of immunodeficiency, active autoimmunity, or chronic inflammatory states."
+    ),
+}
+
+STATUS_LABELS = ("normal", "borderline", "abnormal")
+
+
+# ---------------- Vectorized Tables ----------------
+FIELDS = [name for name in BiomarkerRequest.model_fields if name in REFERENCE_RANGES]
+SYSTEM_NAMES = list(SYSTEMS)
+
+
+def _expand(spec) -> List[List[tuple]]:
+    """Expands a range spec to [gender][age_band] → (low, high)."""
+    def by_age(value):
+        return list(value) if isinstance(value, list) else [value] * (len(AGE_BANDS) + 1)
+
+    if isinstance(spec, dict):
+        return [by_age(spec[gender]) for gender in GENDERS]
+    return [by_age(spec) for _ in GENDERS]
+
+
+_TABLE = np.array([_expand(REFERENCE_RANGES[name]) for name in FIELDS], dtype=np.float64)  # (F, G, A, 2)
+LOW = np.ascontiguousarray(_TABLE[..., 0].transpose(1, 2, 0))   # (G, A, F)
+HIGH = np.ascontiguousarray(_TABLE[..., 1].transpose(1, 2, 0))  # (G, A, F)
+_MARGIN = BORDERLINE_MARGIN * (HIGH - LOW)
+
+# Columns of every system laid end to end, so one `maximum.reduceat` scores all systems.
+_FIELD_INDEX = {name: i for i, name in enumerate(FIELDS)}
+_SYSTEM_COLUMNS = np.array([_FIELD_INDEX[f] for fields in SYSTEMS.values() for f in fields], dtype=np.intp)
+_SYSTEM_OFFSETS = np.cumsum([0] + [len(fields) for fields in SYSTEMS.values()][:-1])
+
+
+def gender_index(gender: str) -> int:
+    return 0 if gender.strip().lower().startswith("m") else 1
+
+
+def age_band(age) -> np.ndarray:
+    return np.searchsorted(AGE_BANDS, age, side="right")
+
+
+# ---------------- Scoring ----------------
+def score_matrix(values: np.ndarray, genders: np.ndarray, ages: np.ndarray):
+    """
+    Scores N panels at once.
+    values: (N, F) in `FIELDS` order; genders: (N,) 0=male/1=female; ages: (N,) years.
+    Returns (field_severity (N, F), system_severity (N, S)) with 0=normal, 1=borderline, 2=abnormal;
+    field_severity is negative for values below range.
+    """
+    bands = age_band(ages)
+    low = LOW[genders, bands]
+    high = HIGH[genders, bands]
+    margin = _MARGIN[genders, bands]
+
+    below = (values < low).astype(np.int8) + (values < low - margin)
+    above = (values > high).astype(np.int8) + (values > high + margin)
+    systems = np.maximum.reduceat(np.maximum(below, above)[:, _SYSTEM_COLUMNS], _SYSTEM_OFFSETS, axis=1)
+    return above - below, systems
+
+
+def panel_values(panels: Sequence[BiomarkerRequest]):
+    """Stacks panels into the (values, genders, ages) arrays expected by `score_matrix`."""
+    values = np.array([[getattr(p, name) for name in FIELDS] for p in panels], dtype=np.float64)
+    genders = np.array([gender_index(p.gender) for p in panels], dtype=np.intp)
+    ages = np.array([p.age for p in panels], dtype=np.float64)
+    return values, genders, ages
+
+
+class PanelScore(BaseModel):
+    """Per-system status and out-of-range fields for one panel."""
+    systems: Dict[str, str]
+    fields: Dict[str, str]
+
+    @property
+    def flagged_systems(self) -> List[str]:
+        return [name for name, status in self.systems.items() if status != "normal"]
+
+    @property
+    def normal_systems(self) -> List[str]:
+        return [name for name, status in self.systems.items() if status == "normal"]
+
+
+def score_panel(data: BiomarkerRequest) -> PanelScore:
+    field_severity, system_severity = score_matrix(*panel_values([data]))
+    fields = {}
+    for name, severity in zip(FIELDS, field_severity[0].tolist()):
+        if severity:
+            direction = "high" if severity > 0 else "low"
+            fields[name] = direction if abs(severity) == 2 else f"borderline {direction}"
+    systems = {name: STATUS_LABELS[s] for name, s in zip(SYSTEM_NAMES, system_severity[0].tolist())}
+    return PanelScore(systems=systems, fields=fields)
+
+
+def merge_system_analysis(score: PanelScore, analysis: Dict[str, str]) -> Dict[str, str]:
+    """Fills normal systems from NORMAL_NARRATIVES around the model's analysis, in report order."""
+    remaining = dict(analysis)
+    merged = {}
+    for name in SYSTEM_NAMES:
+        if name in remaining:
+            merged[name] = remaining.pop(name)
+        elif score.systems[name] == "normal":
+            merged[name] = NORMAL_NARRATIVES[name]
+    merged.update(remaining)
+    return merged
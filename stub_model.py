@@ -0,0 +1,129 @@
+import asyncio
+import random
+import time
+
+from report_parser import parse_medical_report
+from schemas import StructuredReport
+
+
+# ---------------- Canned Report ----------------
+SAMPLE_REPORT = """
+### Executive Summary
+**Top Health Priorities:**
+1. Mildly elevated LDL cholesterol (160 mg/dL) and Apo B suggest increased atherogenic particle burden; dietary fat quality and follow-up lipid testing should be prioritised.
+2. Vitamin D is in the insufficient range (22 ng/mL), which may affect bone mineralisation, immune regulation and mood.
+3. Fasting insulin and HOMA-IR are at the upper end of normal, an early signal of reduced insulin sensitivity worth addressing with lifestyle changes.
+**Key Strengths:**
+- Kidney function, electrolytes and eGFR are excellent, indicating healthy filtration and fluid balance.
+- Liver enzymes and bilirubin are all within range, reflecting intact hepatocyte integrity.
+- Thyroid hormones and antibodies are balanced, consistent with a euthyroid state.
+------------------------------
+### System-Specific Analysis
+**Kidney Function Test**
+Status: Normal. Explanation: Urea, Creatinine, eGFR and electrolytes are within expected reference ranges, indicating excellent glomerular filtration and tubular function.
+**Basic Check-up (CBC & Hematology)**
+Status: Normal. Explanation: Hemoglobin, MCV, RDW, WBC and lymphocytes are within reference ranges with no signs of anemia or infection.
+**Lipid Profile**
+Status: Borderline. Explanation: LDL (160 mg/dL) and Apo B (110 mg/dL) are above optimal targets while HDL remains protective; the Apo B/Apo A-1 ratio indicates moderate cardiovascular risk.
+**Vitamins**
+Status: Low. Explanation: Vitamin D at 22 ng/mL is insufficient; Vitamin B12 is adequate.
+**Diabetic Profile**
+Status: Borderline. Explanation: Fasting glucose and HbA1c are normal, but fasting insulin (18 µIU/mL) and HOMA-IR (2.4) point to early insulin resistance.
+### Personalized Action Plan
+**Nutrition:** Replace saturated fats with olive oil, nuts and oily fish two to three times per week; increase soluble fibre from oats and legumes to 10 g/day.
+**Lifestyle:** Aim for 150 minutes of moderate aerobic activity plus two resistance sessions weekly; get 15-20 minutes of midday sun exposure when possible.
+**Testing:** Repeat lipid panel, Apo B and fasting insulin in 3 months; recheck 25-OH Vitamin D after 8-12 weeks of supplementation.
+**Medical Consultation:** Discuss Vitamin D supplementation dosing and cardiovascular risk assessment with a primary care physician.
+------------------------------
+### Interaction Alerts
+- Vitamin D insufficiency can worsen insulin resistance; correcting it may support glycemic control.
+- Elevated LDL combined with rising insulin increases cardiometabolic risk more than either marker alone.
+"""
+
+# The same report as OUTPUT_MODE=json returns it.
+SAMPLE_JSON_REPORT = StructuredReport.from_report(parse_medical_report(SAMPLE_REPORT, clean=True)).model_dump_json()
+
+
+# ---------------- Stub Response ----------------
+class StubUsage:
+    """Mimics `usage_metadata`, estimating tokens at ~4 characters each."""
+
+    def __init__(self, prompt: str, output: str):
+        self.prompt_token_count = len(prompt) // 4
+        self.candidates_token_count = len(output) // 4
+        self.total_token_count = self.prompt_token_count + self.candidates_token_count
+
+
+class StubResponse:
+    """Mimics the subset of the Gemini response object used by the API."""
+
+    def __init__(self, text: str, usage_metadata: StubUsage = None):
+        self.text = text
+        self.usage_metadata = usage_metadata
+
+
+# ---------------- Stub Model ----------------
+class StubModel:
+    """
+    Local stand-in for `genai.GenerativeModel` that returns a canned report
+    after a fixed delay, for benchmarks and offline runs.
+
+    Fault injection: `jitter` spreads latency log-normally (sigma), a
+    `tail_rate` share of calls takes `tail_latency` seconds instead, and an
+    `error_rate` share fails with `ServiceUnavailable` like an overloaded API.
+    """
+
+    def __init__(
+        self,
+        latency: float = 1.0,
+        report: str = SAMPLE_REPORT,
+        error_rate: float = 0.0,
+        jitter: float = 0.0,
+        tail_rate: float = 0.0,
+        tail_latency: float = 0.0,
+        seed: int = None,
+    ):
+        self.latency = latency
+        self.report = report
+        self.error_rate = error_rate
+        self.jitter = jitter
+        self.tail_rate = tail_rate
+        self.tail_latency = tail_latency
+        self.calls = 0
+        self._rng = random.Random(seed)
+
+    def sample_latency(self) -> float:
+        if self.tail_rate and self._rng.random() < self.tail_rate:
+            return self.tail_latency
+        if self.jitter:
+            return self.latency * self._rng.lognormvariate(0, self.jitter)
+        return self.latency
+
+    def _maybe_fail(self):
+        if self.error_rate and self._rng.random() < self.error_rate:
+            from google.api_core import exceptions as api_exceptions
+
+            raise api_exceptions.ServiceUnavailable("Injected fault: model overloaded")
+
+    def generate_content(self, contents, **kwargs) -> StubResponse:
+        self.calls += 1
+        time.sleep(self.sample_latency())
+        self._maybe_fail()
+        return StubResponse(self.report, StubUsage(str(contents), self.report))
+
+    async def generate_content_async(self, contents, stream: bool = False, **kwargs):
+        self.calls += 1
+        if stream:
+            self._maybe_fail()
+            return self._stream(str(contents))
+        await asyncio.sleep(self.sample_latency())
+        self._maybe_fail()
+        return StubResponse(self.report, StubUsage(str(contents), self.report))
+
+    async def _stream(self, prompt: str, chunk_size: int = 200):
+        """Yields the report in fixed-size chunks spread evenly over the sampled latency; the last one carries usage."""
+        chunks = [self.report[i:i + chunk_size] for i in range(0, len(self.report), chunk_size)]
+        latency = self.sample_latency()
+        for i, chunk in enumerate(chunks):
+            await asyncio.sleep(latency / len(chunks))
+            yield StubResponse(chunk, StubUsage(prompt, self.report) if i == len(chunks) - 1 else None)
@@ -0,0 +1,205 @@
+import asyncio
+import random
+import time
+from collections import deque
+from typing import Optional
+
+from metrics import REGISTRY, Counter
+
+
+# ---------------- Errors ----------------
+# google.api_core errors carry their HTTP status as `.code`; matching on it keeps the
+# grpc-heavy exceptions module off the import path.
+RETRYABLE_STATUS_CODES = frozenset({
+    429,  # ResourceExhausted
+    500,  # InternalServerError
+    503,  # ServiceUnavailable
+    504,  # DeadlineExceeded
+})
+
+
+def is_retryable(error: BaseException) -> bool:
+    return isinstance(error, (TimeoutError, ConnectionError)) or getattr(error, "code", None) in RETRYABLE_STATUS_CODES
+
+
+def chunk_text(chunk) -> str:
+    """Returns a streamed chunk's text, or "" for chunks without text parts (e.g. finish markers)."""
+    # The SDK's `.text` raises ValueError, not AttributeError, when a chunk has no parts.
+    try:
+        return chunk.text or ""
+    except ValueError:
+        return ""
+
+
+class CircuitOpenError(Exception):
+    """Raised without calling Gemini while the circuit breaker is open."""
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"upstream circuit open, retry in {retry_after:.1f}s")
+        self.retry_after = retry_after
+
+
+UPSTREAM_ATTEMPTS = REGISTRY.register(Counter(
+    "upstream_attempts_total", "Gemini call attempts by outcome (ok, retryable, error).", ["outcome"]
+))
+UPSTREAM_HEDGES = REGISTRY.register(Counter(
+    "upstream_hedges_total", "Hedged duplicate Gemini calls by whether the hedge answered first.", ["outcome"]
+))
+UPSTREAM_REJECTED = REGISTRY.register(Counter(
+    "upstream_circuit_rejections_total", "Calls failed fast because the circuit breaker was open."
+))
+
+
+# ---------------- Latency Window ----------------
+class LatencyWindow:
+    """Rolling window of recent successful call latencies used to pick the hedge delay."""
+
+    def __init__(self, size: int = 200):
+        self._samples = deque(maxlen=size)
+
+    def add(self, seconds: float):
+        self._samples.append(seconds)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def quantile(self, q: float) -> float:
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+# ---------------- Circuit Breaker ----------------
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive retryable failures and rejects
+    calls for `reset_timeout` seconds. It then lets one probe call through
+    (half-open): success closes the circuit, failure opens it again.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self._opened_at = 0.0
+
+    def before_call(self):
+        if self.state == self.CLOSED:
+            return
+        remaining = self.reset_timeout - (time.monotonic() - self._opened_at)
+        if remaining > 0:
+            UPSTREAM_REJECTED.inc()
+            raise CircuitOpenError(remaining)
+        # One probe per reset window; concurrent callers keep failing fast until it resolves.
+        self.state = self.HALF_OPEN
+        self._opened_at = time.monotonic()
+
+    def record_success(self):
+        self.state = self.CLOSED
+        self.failures = 0
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            self.state = self.OPEN
+            self._opened_at = time.monotonic()
+
+
+# ---------------- Resilient Model ----------------
+class ResilientModel:
+    """
+    Wraps a `genai.GenerativeModel` (or stub) with bounded retries, hedging and a
+    circuit breaker while keeping the `generate_content_async` interface.
+
+    - Retryable errors are retried up to `max_retries` times with full-jitter
+      exponential backoff (`uniform(0, min(backoff_max, backoff_base * 2**n))`).
+    - Once `hedge_min_samples` latencies are known, a duplicate call is sent if the
+      first has not answered within the `hedge_quantile` latency; the first
+      successful response wins and the other call is cancelled.
+    - Streaming calls get the breaker and retries on the initial request only.
+    """
+
+    def __init__(
+        self,
+        model,
+        breaker: CircuitBreaker,
+        max_retries: int = 2,
+        backoff_base: float = 0.5,
+        backoff_max: float = 8.0,
+        hedge_quantile: float = 0.95,
+        hedge_min_samples: int = 20,
+        window: Optional[LatencyWindow] = None,
+    ):
+        self.model = model
+        self.breaker = breaker
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.hedge_quantile = hedge_quantile
+        self.hedge_min_samples = hedge_min_samples
+        self.window = window or LatencyWindow()
+
+    def hedge_delay(self) -> Optional[float]:
+        if self.hedge_quantile <= 0 or len(self.window) < self.hedge_min_samples:
+            return None
+        return self.window.quantile(self.hedge_quantile)
+
+    def backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    async def generate_content_async(self, contents, stream: bool = False, **kwargs):
+        for attempt in range(self.max_retries + 1):
+            self.breaker.before_call()
+            try:
+                if stream:
+                    response = await self.model.generate_content_async(contents, stream=True, **kwargs)
+                else:
+                    response = await self._hedged(contents, kwargs)
+            except Exception as e:
+                if not is_retryable(e):
+                    UPSTREAM_ATTEMPTS.inc(outcome="error")
+                    raise
+                UPSTREAM_ATTEMPTS.inc(outcome="retryable")
+                self.breaker.record_failure()
+                if attempt == self.max_retries:
+                    raise
+                await asyncio.sleep(self.backoff(attempt))
+                continue
+            UPSTREAM_ATTEMPTS.inc(outcome="ok")
+            self.breaker.record_success()
+            return response
+
+    async def _timed_call(self, contents, kwargs):
+        start = time.perf_counter()
+        response = await self.model.generate_content_async(contents, **kwargs)
+        self.window.add(time.perf_counter() - start)
+        return response
+
+    async def _hedged(self, contents, kwargs):
+        """Runs one call, adding a hedge after `hedge_delay()`; returns the first success."""
+        primary = asyncio.create_task(self._timed_call(contents, kwargs))
+        pending = {primary}
+        hedged = False
+        error = None
+        try:
+            delay = self.hedge_delay()
+            if delay is not None:
+                done, _ = await asyncio.wait(pending, timeout=delay)
+                if not done:
+                    pending.add(asyncio.create_task(self._timed_call(contents, kwargs)))
+                    hedged = True
+
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if hedged:
+                            UPSTREAM_HEDGES.inc(outcome="lost" if task is primary else "won")
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()